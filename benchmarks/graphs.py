@@ -0,0 +1,67 @@
+"""
+Synthetic object graphs for the benchmarks, built locally so that they run offline.
+
+Each case is a dict, as a top level list weaves to a list rather than a WovenClass. Each takes a `scale`, where 1.0
+is the size used for comparing versions and smaller values give quick runs.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict
+
+import numpy as np
+
+
+class Leaf:
+    """A small object, as found in large numbers within fitted models."""
+
+    def __init__(self, index: int) -> None:
+        self.index = index
+        self.name = f"leaf-{index}"
+        self.weight = index * 0.5
+
+
+def _count(base: int, scale: float) -> int:
+    return max(int(base * scale), 1)
+
+
+def deep_nesting(scale: float) -> Any:
+    # Kept well below the recursion limit, which weave and unweave both recurse against.
+    item: Dict[str, Any] = {"value": 0}
+    for depth in range(_count(150, min(scale, 1.0))):
+        item = {"value": depth, "child": item, "siblings": [depth, str(depth)]}
+    return item
+
+
+def wide_dict(scale: float) -> Any:
+    return {f"key-{i}": i if i % 2 else str(i) for i in range(_count(50_000, scale))}
+
+
+def many_small_objects(scale: float) -> Any:
+    return {"leaves": [Leaf(i) for i in range(_count(10_000, scale))]}
+
+
+def shared_references(scale: float) -> Any:
+    shared = [Leaf(i) for i in range(100)]
+    return {
+        "owners": [
+            {"leaf": shared[i % len(shared)], "peer": shared[(i * 7) % len(shared)]}
+            for i in range(_count(10_000, scale))
+        ],
+        "shared": shared,
+    }
+
+
+def large_ndarrays(scale: float) -> Any:
+    rng = np.random.default_rng(0)
+    size = _count(2_000_000, scale)
+    return {f"layer{i}": rng.standard_normal(size, dtype=np.float64) for i in range(8)}
+
+
+CASES: Dict[str, Callable[[float], Any]] = {
+    "deep_nesting": deep_nesting,
+    "wide_dict": wide_dict,
+    "many_small_objects": many_small_objects,
+    "shared_references": shared_references,
+    "large_ndarrays": large_ndarrays,
+}
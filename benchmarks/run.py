@@ -0,0 +1,205 @@
+"""
+Time weave, JSON output, JSON input and unweave on the synthetic graphs in `benchmarks.graphs`.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --compare results.json
+
+Each case runs in its own process, with its own home directory so that artefacts are written to an empty registry,
+and reports the minimum and median time of each phase over `--repeats` runs. Peak memory is reported both as the
+peak traced allocation of each phase, measured in a separate run, and as the peak RSS of the whole process.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _phases(item: Any, directory: pathlib.Path) -> List[Tuple[str, Callable[[], None]]]:
+    from weaver import reader, writer
+    from weaver.data import read_json_dict
+    from weaver.unweave import unweave
+    from weaver.weave import weave
+
+    state: Dict[str, Any] = {}
+    path = directory / "woven.json"
+
+    def weave_phase() -> None:
+        state["woven"] = weave(item)
+
+    def dump_phase() -> None:
+        with open(path, "w") as f:
+            json.dump(state["woven"].as_dict(), f)
+
+    def stream_dump_phase() -> None:
+        with open(path, "w") as f:
+            writer.dump(state["woven"], f)
+
+    def read_json_dict_phase() -> None:
+        with open(path, "r") as f:
+            state["loaded"] = read_json_dict(json.load(f))
+
+    def stream_read_phase() -> None:
+        reader.read_file(path)
+
+    def unweave_phase() -> None:
+        unweave(state["loaded"])
+
+    return [
+        ("weave", weave_phase),
+        ("as_dict+json.dump", dump_phase),
+        ("writer.dump", stream_dump_phase),
+        ("json.load+read_json_dict", read_json_dict_phase),
+        ("reader.read_file", stream_read_phase),
+        ("unweave", unweave_phase),
+    ]
+
+
+def _peak_rss_bytes() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in kilobytes on Linux, but in bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_case(case: str, scale: float, repeats: int, trace_memory: bool) -> Dict[str, Any]:
+    from benchmarks.graphs import CASES
+
+    item = CASES[case](scale)
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for phase, fn in _phases(item, pathlib.Path(directory)):
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn()
+                times.append(time.perf_counter() - start)
+            peak_traced_bytes = None
+            if trace_memory:
+                tracemalloc.start()
+                fn()
+                peak_traced_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            results.append(
+                {
+                    "case": case,
+                    "phase": phase,
+                    "seconds_min": min(times),
+                    "seconds_median": statistics.median(times),
+                    "repeats": repeats,
+                    "peak_traced_bytes": peak_traced_bytes,
+                }
+            )
+    return {"case": case, "peak_rss_bytes": _peak_rss_bytes(), "phases": results}
+
+
+def _run_isolated(case: str, args: argparse.Namespace) -> Dict[str, Any]:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.run",
+        "--worker",
+        case,
+        "--scale",
+        str(args.scale),
+        "--repeats",
+        str(args.repeats),
+    ]
+    if args.no_trace_memory:
+        command.append("--no-trace-memory")
+    with tempfile.TemporaryDirectory() as home:
+        env = dict(os.environ, HOME=home, USERPROFILE=home)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [str(_ROOT)] + [p for p in [os.environ.get("PYTHONPATH")] if p]
+        )
+        completed = subprocess.run(
+            command, cwd=_ROOT, env=env, check=True, stdout=subprocess.PIPE, text=True
+        )
+    return json.loads(completed.stdout)
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Phases whose median time grew by more than `threshold`, as a fraction of the baseline."""
+    previous = {
+        (phase["case"], phase["phase"]): phase["seconds_median"]
+        for case in baseline["cases"]
+        for phase in case["phases"]
+    }
+    regressions = []
+    for case in results["cases"]:
+        for phase in case["phases"]:
+            before = previous.get((phase["case"], phase["phase"]))
+            if before is None or before == 0:
+                continue
+            ratio = phase["seconds_median"] / before
+            line = f"{phase['case']:<20} {phase['phase']:<26} {before:10.4f}s {phase['seconds_median']:10.4f}s {ratio:6.2f}x"
+            print(line, file=sys.stderr)
+            if ratio > 1 + threshold:
+                regressions.append(line)
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    from benchmarks.graphs import CASES
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--case", action="append", choices=sorted(CASES), help="Run only these cases.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Size of the graphs, relative to the default.")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-trace-memory", action="store_true", help="Skip the traced run of each phase.")
+    parser.add_argument("--output", type=pathlib.Path, help="Write results here rather than to stdout.")
+    parser.add_argument("--compare", type=pathlib.Path, help="Results of an earlier run to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Slowdown reported as a regression.")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker is not None:
+        json.dump(run_case(args.worker, args.scale, args.repeats, not args.no_trace_memory), sys.stdout)
+        return 0
+
+    import weaver
+
+    results = {
+        "weaver_version": ".".join(str(part) for part in weaver.__version__),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "cases": [_run_isolated(case, args) for case in (args.case or list(CASES))],
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if args.compare is not None:
+        with open(args.compare, "r") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} phases regressed by more than {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ import json
 from weaver.weave import weave
 
 
-def test_huggingface_model() -> None:
+def test_huggingface_model(tmp_path) -> None:
     processor = TrOCRProcessor.from_pretrained("microsoft/trocr-base-handwritten")
     model = VisionEncoderDecoderModel.from_pretrained(
         "microsoft/trocr-base-handwritten"
@@ -22,5 +22,5 @@ def test_huggingface_model() -> None:
 
     generated_text = processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
     res = weave(model)
-    with open("D:/weaver-json/ExampleHuggingFace.json", "w") as f:
+    with open(tmp_path / "ExampleHuggingFace.json", "w") as f:
         json.dump(res.as_dict(), f)
@@ -1,4 +1,5 @@
-from weaver import weave, unweave
+from weaver.unweave import unweave
+from weaver.weave import weave
 
 """
 The complex case is 
@@ -39,4 +40,4 @@ def test_recursive() -> None:
     dut["a"]["b"] = dut
     res = weave(dut)
     roundtrip = unweave(res)
-    assert res == roundtrip
+    assert roundtrip["a"]["b"] is roundtrip
@@ -0,0 +1,59 @@
+import json
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.data import read_json_dict
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+pd = pytest.importorskip("pandas")
+
+
+def test_arrow_table_roundtrip() -> None:
+    dut = pa.table({"a": np.arange(1000), "b": [str(i) for i in range(1000)]})
+    res = weave(dut)
+    roundtrip = unweave(read_json_dict(json.loads(json.dumps(res.as_dict()))))
+    assert roundtrip.equals(dut)
+    # Columns are views over the memory-mapped artefact rather than copies.
+    payload_size = ArtefactRegistry().path_from_id(res.json["data"]).stat().st_size - 512
+    for column in roundtrip.columns:
+        for buffer in column.chunks[0].buffers():
+            if buffer is None:
+                continue
+            assert buffer.parent is not None
+            while buffer.parent is not None:
+                buffer = buffer.parent
+            assert buffer.size == payload_size
+
+
+@pytest.mark.parametrize(
+    "dut, pickled",
+    [
+        (pd.DataFrame({"a": [1.0, 2.0, None], "b": ["x", "y", "z"]}), False),
+        (pd.DataFrame({"a": [1, 2]}, index=pd.Index(["r1", "r2"], name="row")), False),
+        (
+            pd.DataFrame(
+                {"a": pd.Categorical(["x", "y", "x"]), "b": pd.date_range("2023-01-01", periods=3)}
+            ),
+            False,
+        ),
+        (pd.DataFrame({"a": [1, "b", None]}), True),
+        (pd.DataFrame([[1, 2]], columns=["a", "a"]), True),
+        (pd.DataFrame({"a": [{"x": 1}, {"y": 2}]}), True),
+        (pd.DataFrame({"a": [[1, 2], [3]]}), True),
+        (pd.DataFrame({"a": ["x", None], "b": [b"y", b"z"]}), False),
+    ],
+)
+def test_dataframe_roundtrip(dut, pickled) -> None:
+    res = weave(dut)
+    assert res.json["pickled"] == pickled
+    pd.testing.assert_frame_equal(unweave(res), dut)
+
+
+def test_dataframe_shared() -> None:
+    frame = pd.DataFrame({"a": [1, 2, 3]})
+    roundtrip = unweave(weave({"x": frame, "y": frame}))
+    assert roundtrip["x"] is roundtrip["y"]
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import time
+
+from weaver.artefact_fetcher import AsyncArtefactFetcher, LocalArtefact
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.data import ArtefactID
+from weaver.resource import Resource
+from weaver.serializer import PickleSerializer, RawSerializer
+
+
+class SlowArtefact(LocalArtefact):
+    active = 0
+    most_active = 0
+    lock = threading.Lock()
+
+    def path(self, directory):
+        with self.lock:
+            SlowArtefact.active += 1
+            SlowArtefact.most_active = max(SlowArtefact.most_active, SlowArtefact.active)
+        time.sleep(0.05)
+        with self.lock:
+            SlowArtefact.active -= 1
+        return super().path(directory)
+
+
+def _remote(tmp_path, items, artefact_class=LocalArtefact):
+    remote = tmp_path / "remote"
+    remote.mkdir(exist_ok=True)
+    artefacts = []
+    for i, item in enumerate(items):
+        artefacts.append(artefact_class(PickleSerializer.to_file(item, remote / str(i))))
+    return artefacts
+
+
+def test_fetch_all(tmp_path):
+    items = [list(range(i)) for i in range(5)]
+    artefacts = _remote(tmp_path, items)
+    registry = ArtefactRegistry(tmp_path / "local")
+    artefact_ids = AsyncArtefactFetcher(registry).fetch_all_sync(artefacts + artefacts[:2])
+    assert artefact_ids[:5] == [ArtefactID(PickleSerializer.to_resource(i).digest()) for i in items]
+    assert artefact_ids[5:] == artefact_ids[:2]
+    assert [registry.load_from_id(a) for a in artefact_ids[:5]] == items
+    assert not any(registry.base_path.glob(".partial-*"))
+
+
+def test_concurrency_limit(tmp_path):
+    artefacts = _remote(tmp_path, range(8), SlowArtefact)
+    fetcher = AsyncArtefactFetcher(ArtefactRegistry(tmp_path / "local"), concurrency=3)
+    asyncio.run(fetcher.fetch_all(artefacts))
+    assert SlowArtefact.most_active == 3
+
+
+def test_fetch_all_sync_twice(tmp_path):
+    items = [f"item-{i}" for i in range(4)]
+    artefacts = _remote(tmp_path, items)
+    fetcher = AsyncArtefactFetcher(ArtefactRegistry(tmp_path / "local"), concurrency=1)
+    expected = [ArtefactID(PickleSerializer.to_resource(i).digest()) for i in items]
+    # Each call runs its own event loop, and waits on the semaphore as only one download runs at once.
+    assert fetcher.fetch_all_sync(artefacts[:2]) == expected[:2]
+    assert fetcher.fetch_all_sync(artefacts[2:]) == expected[2:]
+
+
+def _remote_registry_artefact(remote, artefact_id):
+    return LocalArtefact(remote.path_from_id(artefact_id))
+
+
+def test_fetch_compressed(tmp_path):
+    remote = ArtefactRegistry(tmp_path / "remote", codec="zlib")
+    resource = Resource(memoryview(bytes(10000)), RawSerializer.tag())
+    artefact_id = remote.save_resource(resource)
+    registry = ArtefactRegistry(tmp_path / "local")
+    fetched = AsyncArtefactFetcher(registry).fetch_all_sync(
+        [_remote_registry_artefact(remote, artefact_id)]
+    )
+    assert fetched == [artefact_id]
+    assert registry.load_payload(artefact_id) == bytes(10000)
+
+
+def test_fetch_chunked(tmp_path):
+    remote = ArtefactRegistry(tmp_path / "remote", chunk_size=1000, codec="zlib")
+    data = bytes(range(256)) * 20
+    artefact_id = remote.save_buffer(memoryview(data), RawSerializer.tag())
+    registry = ArtefactRegistry(tmp_path / "local")
+    fetched = AsyncArtefactFetcher(registry).fetch_all_sync(
+        [_remote_registry_artefact(remote, artefact_id)]
+    )
+    assert fetched == [artefact_id]
+    assert len(list(registry.base_path.glob("Chunk(_id=*)"))) == 6
+    assert registry.load_payload(artefact_id) == data
+    assert not any(registry.base_path.glob(".partial-*"))
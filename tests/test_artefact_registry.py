@@ -1,13 +1,196 @@
-from weaver.artefact_registry import ArtefactRegistry
-from weaver.data import ArtefactID
-from weaver.serializer import PickleSerializer
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry, ArtefactPrefetcher
+from weaver.data import ArtefactID, iter_artefacts
+from weaver.resource import Resource
+from weaver.serializer import PickleSerializer, RawSerializer
+from weaver.unweave import unweave
+from weaver.weave import weave
 
 
 def test_roundtrip():
     registry = ArtefactRegistry()
     item = 2
     serialized_item = PickleSerializer.to_resource(item)
-    artefact_id = ArtefactID(hash(serialized_item))
+    artefact_id = ArtefactID(serialized_item.digest())
     registry.save_using_id(artefact_id, serialized_item.inner)
     roundtrip_item = registry.load_from_id(artefact_id)
     assert roundtrip_item == item
+
+
+def test_load_payload():
+    registry = ArtefactRegistry()
+    artefact_id = registry.save_buffer(memoryview(b"payload"), RawSerializer.tag())
+    payload = registry.load_payload(artefact_id)
+    assert isinstance(payload, memoryview)
+    assert payload == b"payload"
+    assert isinstance(registry.load_from_id(artefact_id), memoryview)
+
+
+def test_resource_from_buffer():
+    data = memoryview(PickleSerializer.to_resource([1, 2]).inner)
+    resource = Resource.from_weaver_artefact(data)
+    assert resource.tag() == PickleSerializer.tag()
+    assert resource.buffer().obj is data.obj
+    assert PickleSerializer.from_resource(None, resource) == [1, 2]
+
+
+def test_existing_content_is_not_rewritten(tmp_path):
+    registry = ArtefactRegistry(tmp_path)
+    artefact_id = registry.save_resource(PickleSerializer.to_resource("docs"))
+    inode = registry.path_from_id(artefact_id).stat().st_ino
+    assert registry.save_resource(PickleSerializer.to_resource("docs")) == artefact_id
+    # Rewriting would replace the file, but saving again only updates its modification time.
+    assert registry.path_from_id(artefact_id).stat().st_ino == inode
+    assert [
+        p.name for p in tmp_path.joinpath("artefacts").iterdir() if p.name != ".lock"
+    ] == [str(artefact_id)]
+
+
+def test_gc_keeps_artefacts_saved_after_release(tmp_path):
+    registry = ArtefactRegistry(tmp_path)
+    artefact_id = registry.save_resource(PickleSerializer.to_resource("resaved"))
+    registry.track(artefact_id)
+    registry.untrack(artefact_id)
+    # A weave which found the content already present, and has not tracked it yet.
+    assert registry.save_resource(PickleSerializer.to_resource("resaved")) == artefact_id
+    assert registry.gc() == []
+    assert registry.exists(artefact_id)
+    assert registry.gc(untracked=True) == [artefact_id]
+
+
+def _add_references(base_path, artefact_ids):
+    registry = ArtefactRegistry(base_path)
+    for _ in range(50):
+        registry.add_references(artefact_ids)
+
+
+def test_concurrent_reference_counting(tmp_path):
+    artefact_ids = [ArtefactID(i) for i in range(3)]
+    with ProcessPoolExecutor(4) as executor:
+        list(executor.map(_add_references, [tmp_path] * 4, [artefact_ids] * 4))
+    registry = ArtefactRegistry(tmp_path)
+    assert [registry.references(a) for a in artefact_ids] == [200] * 3
+
+
+def test_reference_counting_and_gc(tmp_path):
+    registry = ArtefactRegistry(tmp_path)
+    shared = registry.save_resource(PickleSerializer.to_resource("shared"))
+    first_only = registry.save_resource(PickleSerializer.to_resource("first"))
+    untracked = registry.save_resource(PickleSerializer.to_resource("untracked"))
+    first, second = [shared, {"a": first_only}], [shared]
+    registry.track(first)
+    registry.track(second)
+    assert registry.references(shared) == 2
+    assert registry._read_index()[str(shared.artefact_id)]["size"] > 0
+
+    registry.untrack(first)
+    assert registry.gc() == [first_only]
+    assert not registry.exists(first_only)
+    assert registry.exists(shared)
+    assert registry.exists(untracked)
+
+    assert registry.gc(untracked=True) == [untracked]
+    registry.untrack(second)
+    assert registry.gc() == [shared]
+    assert not any(registry.base_path.glob("ArtefactID*"))
+
+
+def test_prefetcher(tmp_path):
+    registry = ArtefactRegistry(tmp_path)
+    artefact_ids = [
+        registry.save_resource(PickleSerializer.to_resource(list(range(i)))) for i in range(10)
+    ]
+    with ArtefactPrefetcher(registry, artefact_ids, workers=2, max_buffered_bytes=1024):
+        loaded = [registry.load_from_id(artefact_id) for artefact_id in artefact_ids]
+        # Already taken, so the second load reads the artefact directly.
+        assert registry.load_from_id(artefact_ids[3]) == list(range(3))
+    assert loaded == [list(range(i)) for i in range(10)]
+
+
+def test_iter_artefacts_order():
+    first, second, third = ArtefactID(1), ArtefactID(2), ArtefactID(3)
+    assert list(iter_artefacts([first, {"a": second, "b": (third, first)}])) == [
+        first,
+        second,
+        third,
+        first,
+    ]
+
+
+@pytest.mark.parametrize("hash_algorithm", ["blake2b", "sha3_256", "sha256"])
+def test_hash_algorithm_recorded(tmp_path, hash_algorithm):
+    registry = ArtefactRegistry(tmp_path)
+    resource = Resource(b"payload", RawSerializer.tag(), hash_algorithm)
+    artefact_id = registry.save_resource(resource)
+    assert artefact_id.artefact_id.bit_length() > 64
+    loaded = Resource.from_weaver_artefact(registry.load_buffer(artefact_id))
+    assert loaded.tag() == RawSerializer.tag()
+    assert loaded.hash_algorithm == hash_algorithm
+    assert loaded.digest() == artefact_id.artefact_id
+
+
+def test_legacy_header_hash_algorithm():
+    header = Resource.write_tag(RawSerializer.tag())
+    assert Resource.read_tag(header) == RawSerializer.tag()
+    assert Resource.read_hash_algorithm(header) == "sha3_256"
+
+
+def test_hash_chunks_matches_whole(tmp_path):
+    data = bytes(range(256)) * 1000
+    resource = Resource(memoryview(data), RawSerializer.tag())
+    path = tmp_path / "artefact"
+    with open(path, "wb") as f:
+        resource.write(f)
+    assert ArtefactRegistry(tmp_path).adopt_file(path).artefact_id == resource.digest()
+
+
+def test_chunked_roundtrip(tmp_path):
+    registry = ArtefactRegistry(tmp_path, chunk_size=1000)
+    data = bytes(range(256)) * 20
+    artefact_id = registry.save_buffer(memoryview(data), RawSerializer.tag())
+    assert len(list(registry.base_path.glob("Chunk(_id=*)"))) == 6
+    assert registry.load_payload(artefact_id) == data
+    assert ArtefactRegistry(tmp_path).load_from_id(artefact_id) == data
+
+
+def test_chunked_id_independent_of_layout(tmp_path):
+    data = bytes(range(256)) * 20
+    resource = Resource(memoryview(data), RawSerializer.tag())
+    ids = {
+        ArtefactRegistry(tmp_path / str(chunk_size), chunk_size=chunk_size).save_resource(resource)
+        for chunk_size in [None, 1000, 2048]
+    }
+    assert ids == {ArtefactID(resource.digest())}
+    # Already present, so not chunked again.
+    registry = ArtefactRegistry(tmp_path / "None", chunk_size=1000)
+    registry.save_resource(resource)
+    assert not any(registry.base_path.glob("Chunk(_id=*)"))
+
+
+def test_chunks_shared_between_artefacts(tmp_path):
+    registry = ArtefactRegistry(tmp_path, chunk_size=1000)
+    base = bytearray(4000)
+    first = registry.save_buffer(memoryview(base), RawSerializer.tag())
+    base[2500] = 1
+    second = registry.save_buffer(memoryview(base), RawSerializer.tag())
+    # An all-zero chunk, shared three times over, and the one changed chunk.
+    assert len(list(registry.base_path.glob("Chunk(_id=*)"))) == 2
+    assert registry.load_payload(second) == base
+    registry.add_references([second])
+    registry.remove_references([second])
+    registry.gc()
+    assert len(list(registry.base_path.glob("Chunk(_id=*)"))) == 1
+    assert registry.load_payload(first) == bytes(4000)
+
+
+def test_directory_removed_between_weaves(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    weave({"first": np.arange(4.0)})
+    shutil.rmtree(ArtefactRegistry().base_path)
+    res = weave({"second": np.arange(5.0)})
+    assert np.array_equal(unweave(res)["second"], np.arange(5.0))
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from weaver.data import IncorrectParseError, read_json_dict
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+binary = pytest.importorskip("weaver.binary")
+pytest.importorskip("msgpack")
+
+
+class Node:
+    def __init__(self, value, children=()):
+        self.value = value
+        self.children = list(children)
+
+
+def _tree():
+    shared = Node("shared")
+    return {
+        "nodes": [Node(i, [shared, Node(-i)]) for i in range(20)],
+        "shared": shared,
+        "weights": np.arange(10.0),
+        "big": 2**100,
+        "keys": {1: "one", None: "none"},
+    }
+
+
+def test_binary_matches_json() -> None:
+    woven = weave(_tree())
+    from_json = read_json_dict(json.loads(json.dumps(woven.as_dict())))
+    encoded = binary.dumps(woven)
+    assert binary.loads(encoded) == from_json
+    assert len(encoded) < len(json.dumps(woven.as_dict())) / 2
+
+
+def test_binary_unweave(tmp_path) -> None:
+    dut = _tree()
+    path = tmp_path / "tree.weaver"
+    with open(path, "wb") as f:
+        binary.dump(weave(dut), f)
+    roundtrip = unweave(binary.read_file(path))
+    assert roundtrip["nodes"][3].children[0] is roundtrip["shared"]
+    assert roundtrip["big"] == 2**100
+    assert np.array_equal(roundtrip["weights"], dut["weights"])
+
+
+class Documented:
+    """Documented for the binary encoding."""
+
+    def __init__(self, value) -> None:
+        self.value = value
+
+
+def test_json_to_binary_unweave() -> None:
+    woven = weave({"documented": Documented(1), "tree": _tree()})
+    from_json = read_json_dict(json.loads(json.dumps(woven.as_dict())))
+    decoded = binary.loads(binary.dumps(from_json))
+    assert decoded == from_json
+    roundtrip = unweave(decoded)
+    assert roundtrip["documented"].value == 1
+    assert roundtrip["tree"]["nodes"][3].children[0] is roundtrip["tree"]["shared"]
+
+
+def test_not_binary() -> None:
+    with pytest.raises(IncorrectParseError):
+        binary.loads(b"\x81\xa1a\x01")
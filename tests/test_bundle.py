@@ -0,0 +1,56 @@
+import shutil
+
+import numpy as np
+import pytest
+
+from weaver import bundle
+from weaver.artefact_registry import ArtefactBundle, ArtefactRegistry
+from weaver.data import IncorrectParseError, find_artefacts
+
+
+class Model:
+    def __init__(self) -> None:
+        self.weights = np.random.rand(50, 4)
+        self.tied = self.weights
+        self.config = {"name": "model", "layers": [1, 2, 3]}
+
+
+def test_bundle_roundtrip(tmp_path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    dut = Model()
+    path = tmp_path / "model.weaver"
+    woven = bundle.save(dut, path)
+    # The bundle holds every artefact, so it loads without the ArtefactRegistry.
+    shutil.rmtree(ArtefactRegistry().base_path)
+    roundtrip = bundle.load(path)
+    assert np.array_equal(roundtrip.weights, dut.weights)
+    assert roundtrip.tied is roundtrip.weights
+    assert roundtrip.config == dut.config
+    assert bundle.read(path).json["config"].json == woven.json["config"].json
+
+
+def test_bundle_alignment(tmp_path) -> None:
+    path = tmp_path / "arrays.weaver"
+    dut = {"a": np.arange(3, dtype=np.int8), "b": np.arange(5.0), "c": np.arange(7, dtype=np.int16)}
+    woven = bundle.save(dut, path)
+    assert all(artefact_id in ArtefactBundle(path) for artefact_id in find_artefacts(woven))
+    roundtrip = bundle.load(path)
+    for key, value in dut.items():
+        assert np.array_equal(roundtrip[key], value)
+        assert roundtrip[key].ctypes.data % 64 == 0
+
+
+def test_equal_arrays_not_shared(tmp_path) -> None:
+    path = tmp_path / "zeros.weaver"
+    bundle.save({"a": np.zeros(10), "b": np.zeros(10)}, path)
+    roundtrip = bundle.load(path)
+    roundtrip["a"][0] = 1.0
+    assert roundtrip["b"][0] == 0.0
+    assert roundtrip["b"].ctypes.data % 64 == 0
+
+
+def test_not_a_bundle(tmp_path) -> None:
+    path = tmp_path / "other"
+    path.write_bytes(b"not a bundle at all, but long enough to have a header")
+    with pytest.raises(IncorrectParseError):
+        ArtefactBundle(path)
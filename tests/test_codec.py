@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.codec import available_codecs, compress, _decompressed_pieces, _get_codec, _SLICE_BYTES
+from weaver.resource import Resource
+from weaver.data import find_artefacts
+from weaver.serializer import PickleSerializer, RawSerializer
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_compressed_roundtrip(tmp_path, codec):
+    registry = ArtefactRegistry(tmp_path, codec=codec)
+    data = bytes(3_000_000)
+    artefact_id = registry.save_buffer(memoryview(data), RawSerializer.tag())
+    assert registry.path_from_id(artefact_id).stat().st_size < len(data) // 10
+    assert Resource.read_codec(registry.load_buffer(artefact_id)[:512]) is None
+    # The codec is recorded with the artefact, so a registry without one can read it.
+    assert ArtefactRegistry(tmp_path).load_payload(artefact_id) == data
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_compressed_chunks(tmp_path, codec):
+    registry = ArtefactRegistry(tmp_path, chunk_size=1000, codec=codec)
+    data = bytes(range(256)) * 20
+    artefact_id = registry.save_buffer(memoryview(data), RawSerializer.tag())
+    assert ArtefactRegistry(tmp_path).load_payload(artefact_id) == data
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_id_independent_of_codec(tmp_path, codec):
+    resource = Resource(memoryview(bytes(100_000)), RawSerializer.tag())
+    plain = ArtefactRegistry(tmp_path)
+    artefact_id = plain.save_resource(resource)
+    assert artefact_id.artefact_id == resource.digest()
+    # Already present uncompressed, so it is neither compressed nor rewritten.
+    assert ArtefactRegistry(tmp_path, codec=codec).save_resource(resource) == artefact_id
+    assert plain.path_from_id(artefact_id).stat().st_size == 100_512
+    assert ArtefactRegistry(tmp_path / "compressed", codec=codec).save_resource(resource) == artefact_id
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_decompressed_pieces_bounded(codec):
+    data = memoryview(bytes(20 * _SLICE_BYTES))
+    compressed = b"".join(compress(codec, data))
+    pieces = [len(piece) for piece in _decompressed_pieces(_get_codec(codec), memoryview(compressed))]
+    assert sum(pieces) == len(data)
+    assert max(pieces) <= _SLICE_BYTES
+
+
+def test_codec_by_serializer(tmp_path):
+    registry = ArtefactRegistry(tmp_path, codec="zlib", codecs={RawSerializer: None})
+    raw_id = registry.save_buffer(memoryview(bytes(1000)), RawSerializer.tag())
+    pickled_id = registry.save_resource(PickleSerializer.to_resource([0] * 1000))
+    assert registry.path_from_id(raw_id).stat().st_size == 1512
+    assert Resource.read_codec(registry.path_from_id(pickled_id).read_bytes()[:512]) == "zlib"
+    assert registry.load_from_id(pickled_id) == [0] * 1000
+
+
+def test_unknown_codec(tmp_path):
+    with pytest.raises(RuntimeError):
+        ArtefactRegistry(tmp_path, codec="missing").save_buffer(memoryview(b"data"), RawSerializer.tag())
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_weave_with_registry(tmp_path, workers):
+    registry = ArtefactRegistry(tmp_path, codec="zlib")
+    dut = {"x": np.random.default_rng().random(100), "y": np.zeros(1000)}
+    res = weave(dut, workers=workers, artefact_registry=registry)
+    for artefact_id in find_artefacts(res):
+        assert Resource.read_codec(registry.path_from_id(artefact_id).read_bytes()[:512]) == "zlib"
+    assert not ArtefactRegistry().exists(res.json["x"].json["data"])
+    roundtrip = unweave(res, artefact_registry=registry)
+    assert np.array_equal(roundtrip["x"], dut["x"])
+    with registry:
+        assert np.array_equal(unweave(res, workers=2)["y"], dut["y"])
@@ -0,0 +1,38 @@
+import numpy as np
+
+from weaver.lazy import LazyArtefact, is_loaded, resolve
+from weaver.unweave import unweave
+from weaver.weave import weave, write_as_artefact
+
+
+class Config:
+    def __init__(self, name: str, head: dict) -> None:
+        self.name = name
+        self.head = head
+
+
+def test_lazy_artefact_loads_on_access() -> None:
+    dut = LazyArtefact(write_as_artefact({"a": [1, 2, 3]}))
+    assert not is_loaded(dut)
+    assert dut["a"] == [1, 2, 3]
+    assert is_loaded(dut)
+    assert isinstance(dut, dict)
+    assert resolve(dut) == {"a": [1, 2, 3]}
+
+
+def test_lazy_artefact_operators() -> None:
+    dut = LazyArtefact(write_as_artefact(3))
+    assert dut + 1 == 4
+    assert 1 + dut == 4
+    assert dut == 3
+    assert np.array_equal(np.asarray(LazyArtefact(write_as_artefact(np.ones(3)))), np.ones(3))
+
+
+def test_lazy_unweave() -> None:
+    dut = {"config": Config("model", {"steps": range(10)})}
+    roundtrip = unweave(weave(dut), lazy=True)
+    assert roundtrip["config"].name == "model"
+    steps = roundtrip["config"].head["steps"]
+    assert type(steps) is LazyArtefact
+    assert not is_loaded(steps)
+    assert list(steps) == list(range(10))
@@ -0,0 +1,45 @@
+from weaver.data import ItemMetadataWithVersion, _DETECTED_METADATA
+from weaver.version import UnknownVersion
+
+
+class SimpleClass:
+    pass
+
+
+def simple_function() -> None:
+    pass
+
+
+def test_detect_is_cached() -> None:
+    first = ItemMetadataWithVersion.detect(SimpleClass())
+    assert first.name == "SimpleClass"
+    assert first.module == tuple(__name__.split("."))
+    assert first.version == UnknownVersion()
+    assert ItemMetadataWithVersion.detect(SimpleClass()) is first
+
+
+def test_detect_named_items() -> None:
+    assert ItemMetadataWithVersion.detect(SimpleClass).name == "SimpleClass"
+    assert ItemMetadataWithVersion.detect(simple_function).name == "simple_function"
+    assert ItemMetadataWithVersion.detect(SimpleClass()).name == "SimpleClass"
+
+
+def test_detect_named_items_not_cached() -> None:
+    ItemMetadataWithVersion.clear_detected()
+    for i in range(10):
+        def named_function() -> None:
+            pass
+
+        named_function.__name__ = f"named_function_{i}"
+        assert ItemMetadataWithVersion.detect(named_function).name == f"named_function_{i}"
+    assert not _DETECTED_METADATA
+
+
+def test_clear_detected() -> None:
+    ItemMetadataWithVersion.detect(SimpleClass())
+    ItemMetadataWithVersion.detect(b"")
+    ItemMetadataWithVersion.clear_detected(__name__.split(".")[0])
+    assert SimpleClass not in _DETECTED_METADATA
+    assert bytes in _DETECTED_METADATA
+    ItemMetadataWithVersion.clear_detected()
+    assert not _DETECTED_METADATA
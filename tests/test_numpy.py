@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.data import read_json_dict
+from weaver.registry import WeaverRegistry, WeaverNdarraySerializer
+from weaver.resource import Resource
+from weaver.serializer import RawSerializer
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+
+@pytest.mark.parametrize(
+    "dut",
+    [
+        np.arange(12, dtype=np.float32).reshape(3, 4),
+        np.asfortranarray(np.arange(12, dtype=np.int64).reshape(3, 4)),
+        np.arange(20, dtype=np.int16).reshape(4, 5)[::2, ::-1],
+        np.array(3.5),
+        np.zeros((0, 3)),
+        np.arange(4, dtype=">u4"),
+        np.array(["2023-01-01", "2023-06-01"], dtype="datetime64[D]"),
+    ],
+)
+def test_ndarray_roundtrip(dut) -> None:
+    res = weave(dut)
+    assert not res.json["pickled"]
+    roundtrip = unweave(res)
+    assert roundtrip.dtype == dut.dtype
+    assert np.array_equal(roundtrip, dut)
+    roundtrip[...] = 0
+    assert np.array_equal(unweave(res), dut)
+
+
+def test_ndarray_raw_artefact() -> None:
+    dut = np.arange(10, dtype=np.float64)
+    res = weave(dut)
+    assert WeaverRegistry.defaults().try_get_serializer(dut) is WeaverNdarraySerializer
+    with open(ArtefactRegistry().path_from_id(res.json["data"]), "rb") as f:
+        data = f.read()
+    assert Resource.read_tag(data[: Resource.tag_length_bytes()]) == RawSerializer.tag()
+    assert data[Resource.tag_length_bytes() :] == dut.tobytes()
+
+
+@pytest.mark.parametrize(
+    "dut",
+    [
+        np.array([1, "a", None], dtype=object),
+        np.array([(1, 2.0)], dtype=[("a", "i4"), ("b", "f8")]),
+    ],
+)
+def test_ndarray_pickled_fallback(dut) -> None:
+    res = weave(dut)
+    assert res.json["pickled"]
+    roundtrip = unweave(res)
+    assert roundtrip.dtype == dut.dtype
+    assert np.array_equal(roundtrip, dut)
+
+
+def test_ndarray_json_roundtrip() -> None:
+    dut = {"weights": np.random.rand(5, 3)}
+    dict_res = weave(dut).as_dict()
+    roundtrip = unweave(read_json_dict(json.loads(json.dumps(dict_res))))
+    assert np.array_equal(roundtrip["weights"], dut["weights"])
+
+
+def test_ndarray_prefetched_unweave() -> None:
+    dut = {f"layer{i}": np.random.rand(100, 10) for i in range(10)}
+    dut["tied"] = dut["layer0"]
+    roundtrip = unweave(weave(dut), workers=4)
+    for key in dut:
+        assert np.array_equal(roundtrip[key], dut[key])
+    assert roundtrip["tied"] is roundtrip["layer0"]
+    roundtrip["layer1"][0, 0] = -1.0
+    assert dut["layer1"][0, 0] != -1.0
+
+
+def test_many_arrays_within_file_limit() -> None:
+    resource = pytest.importorskip("resource")
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    dut = [np.full(16, i, dtype=np.float64) for i in range(300)]
+    res = weave(dut)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (256, hard))
+    try:
+        roundtrip = unweave(res)
+    finally:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (soft, hard))
+    assert all(np.array_equal(a, b) for (a, b) in zip(roundtrip, dut))
+    assert all(a.ctypes.data % 64 == 0 for a in roundtrip)
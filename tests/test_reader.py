@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pytest
+
+from weaver.data import read_json_dict, CacheMarker
+from weaver.reader import loads, read_file
+from weaver.unweave import unweave
+from weaver.weave import weave
+from weaver.writer import dumps
+
+
+class SimpleClass:
+    def __init__(self, b) -> None:
+        self.b = b
+
+    def __eq__(self, other):
+        return self.b == other.b
+
+
+def _model():
+    shared = SimpleClass("shared")
+    return {
+        "config": {"name": "model \"one\"", "sizes": [1, 2, {"nested": [3]}]},
+        "encoder": SimpleClass({"weights": np.arange(4.0), "shared": shared}),
+        "decoder": [SimpleClass(1), SimpleClass((2, 3)), shared],
+    }
+
+
+@pytest.mark.parametrize("types", [False, True])
+@pytest.mark.parametrize("dut", [SimpleClass(5), _model(), [SimpleClass(1), b"123"]])
+def test_matches_read_json_dict(dut, types) -> None:
+    res = weave(dut)
+    encoded = dumps(res, types=types)
+    assert loads(encoded) == read_json_dict(json.loads(encoded))
+
+
+def test_roundtrip() -> None:
+    dut = _model()
+    roundtrip = unweave(loads(dumps(weave(dut))))
+    assert roundtrip["config"] == dut["config"]
+    assert roundtrip["decoder"][2] is roundtrip["encoder"].b["shared"]
+    assert np.array_equal(roundtrip["encoder"].b["weights"], np.arange(4.0))
+
+
+@pytest.mark.parametrize(
+    "key_path, expected",
+    [
+        (["config"], {"name": "model \"one\"", "sizes": [1, 2, {"nested": [3]}]}),
+        (["config", "sizes", 2, "nested"], [3]),
+        (["decoder", 1], SimpleClass((2, 3))),
+        (["encoder", "b", "weights"], np.arange(4.0)),
+    ],
+)
+@pytest.mark.parametrize("types", [False, True])
+def test_key_path(tmp_path, key_path, expected, types) -> None:
+    encoded = dumps(weave(_model()), types=types)
+    path = tmp_path / "model.json"
+    path.write_text(encoded)
+    for subtree in [loads(encoded, key_path), read_file(path, key_path)]:
+        roundtrip = unweave(subtree)
+        if isinstance(expected, np.ndarray):
+            assert np.array_equal(roundtrip, expected)
+        else:
+            assert roundtrip == expected
+
+
+@pytest.mark.parametrize("types", [False, True])
+def test_key_path_cache_marker(types) -> None:
+    subtree = loads(dumps(weave(_model()), types=types), ["decoder", 2])
+    assert isinstance(subtree, CacheMarker)
+
+
+def test_missing_key() -> None:
+    with pytest.raises(KeyError):
+        loads(dumps(weave(_model())), ["missing"])
+    with pytest.raises(IndexError):
+        loads(dumps(weave(_model())), ["decoder", 3])
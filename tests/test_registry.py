@@ -0,0 +1,160 @@
+from typing import Any, Callable, Dict, NamedTuple
+
+from weaver.data import ItemMetadataWithVersion, WovenClass
+from weaver.registry import (
+    WeaverRegistry,
+    WeaverSerializer,
+    WeaverDeserializer,
+    WeaverTupleSerializer,
+    WeaverTypeSerializer,
+)
+from weaver.version import AllVersions, Version, VersionRange, UnknownVersion
+
+
+class Base:
+    pass
+
+
+class Child(Base):
+    pass
+
+
+class Pair(NamedTuple):
+    a: int
+    b: int
+
+
+class WeaverBaseSerializer(WeaverSerializer[Base]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(__name__.split(".")), name="Base", version=AllVersions()
+    )
+    _include_subclasses = True
+
+    @classmethod
+    def weave(
+            cls,
+            item: Base,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        raise NotImplementedError
+
+
+def test_dispatch_is_cached() -> None:
+    registry = WeaverRegistry.defaults()
+    assert registry.try_get_serializer((1,)) is WeaverTupleSerializer
+    assert registry._dispatch[tuple] is WeaverTupleSerializer
+    assert registry.try_get_serializer(Base()) is None
+    assert Base in registry._dispatch
+
+
+def test_subclasses_opt_in() -> None:
+    registry = WeaverRegistry.defaults()
+    assert registry.try_get_serializer(Pair(1, 2)) is None
+    assert registry.try_get_serializer(Child()) is None
+    registry.add_serializer(WeaverBaseSerializer)
+    assert registry.try_get_serializer(Child()) is WeaverBaseSerializer
+    assert registry.try_get_serializer(Base()) is WeaverBaseSerializer
+
+
+def test_classes_dispatch_by_name() -> None:
+    registry = WeaverRegistry.defaults()
+    registry.add_serializer(WeaverBaseSerializer)
+    assert registry.try_get_serializer(Child) is None
+    assert registry.try_get_serializer(type) is WeaverTypeSerializer
+
+
+# A class whose module cannot be imported, as for classes built in a REPL or by extension modules.
+Unimportable = type("Unimportable", (Base,), {"__module__": "not_an_importable_module"})
+
+
+class WeaverUnimportableSerializer(WeaverSerializer[Unimportable]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["not_an_importable_module"]), name="Unimportable", version=AllVersions()
+    )
+
+
+def test_unimportable_bases_skipped() -> None:
+    registry = WeaverRegistry.defaults()
+    assert registry.try_get_serializer(Unimportable()) is None
+    registry.add_serializer([WeaverBaseSerializer, WeaverUnimportableSerializer])
+    assert registry.try_get_serializer(Unimportable()) is WeaverBaseSerializer
+
+
+def _deserializer(version):
+    class WeaverVersionedDeserializer(WeaverDeserializer[Base]):
+        _metadata = ItemMetadataWithVersion(
+            module=tuple(__name__.split(".")), name="Base", version=version
+        )
+
+    return WeaverVersionedDeserializer
+
+
+def _woven(version) -> WovenClass:
+    return WovenClass(
+        pointer=0,
+        metadata=ItemMetadataWithVersion(
+            module=tuple(__name__.split(".")), name="Base", version=version
+        ),
+        artefacts=set(),
+        documentation={},
+        method_source={},
+        json={},
+    )
+
+
+def test_version_range_parsing() -> None:
+    version_range = VersionRange.from_str(">=1.2,<1.4")
+    assert str(version_range) == ">=1.2.0,<1.4.0"
+    assert Version(1, 2, 0) in version_range
+    assert Version(1, 3, 9) in version_range
+    assert Version(1, 4, 0) not in version_range
+    assert Version(1, 1, 9) not in version_range
+    assert Version(2, 0, 1) in VersionRange.from_str("==2.0.1")
+
+
+def test_version_resolution() -> None:
+    registry = WeaverRegistry()
+    fallback = _deserializer(AllVersions())
+    old = _deserializer(VersionRange.from_str("<1.2"))
+    current = _deserializer(VersionRange.from_str(">=1.2,<1.4"))
+    exact = _deserializer(Version(1, 3, 1))
+    registry.add_serializer([fallback, old, current, exact])
+    assert registry.try_get_deserializer(_woven(Version(1, 0, 0))) is old
+    assert registry.try_get_deserializer(_woven(Version(1, 3, 0))) is current
+    assert registry.try_get_deserializer(_woven(Version(1, 3, 1))) is exact
+    assert registry.try_get_deserializer(_woven(Version(1, 4, 0))) is fallback
+    assert registry.try_get_deserializer(_woven(UnknownVersion())) is fallback
+
+
+def test_many_version_ranges() -> None:
+    registry = WeaverRegistry()
+    deserializers = {
+        minor: _deserializer(VersionRange.from_str(f">=1.{minor},<1.{minor + 1}"))
+        for minor in range(300)
+    }
+    registry.add_serializer(list(reversed(deserializers.values())))
+    for minor in [0, 17, 150, 299]:
+        version = Version(1, minor, 5)
+        assert registry.try_get_deserializer(_woven(version)) is deserializers[minor]
+    assert registry.try_get_deserializer(_woven(Version(2, 0, 0))) is None
+
+
+def test_version_range_json_roundtrip() -> None:
+    metadata = _woven(VersionRange.from_str(">1.0,<=2.1")).metadata
+    assert ItemMetadataWithVersion.read(metadata.as_dict()) == metadata
+
+
+def test_overlapping_version_ranges() -> None:
+    registry = WeaverRegistry()
+    wide = _deserializer(VersionRange.from_str(">=1.0,<=2.0"))
+    narrow = _deserializer(VersionRange.from_str(">1.2,<1.3"))
+    later = _deserializer(VersionRange.from_str(">=1.5,<1.6"))
+    registry.add_serializer([wide, narrow, later])
+    assert registry.try_get_deserializer(_woven(Version(1, 2, 0))) is wide
+    assert registry.try_get_deserializer(_woven(Version(1, 2, 5))) is narrow
+    assert registry.try_get_deserializer(_woven(Version(1, 4, 0))) is wide
+    assert registry.try_get_deserializer(_woven(Version(1, 5, 0))) is later
+    assert registry.try_get_deserializer(_woven(Version(2, 0, 0))) is wide
+    assert registry.try_get_deserializer(_woven(Version(2, 0, 1))) is None
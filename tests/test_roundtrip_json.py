@@ -45,3 +45,12 @@ def test_with_artefact(dut) -> None:
     _ = json.dumps(dict_res)
     roundtrip = unweave(roundtrip_res)
     assert dut == roundtrip
+
+
+def test_recursive_reference() -> None:
+    dut = {"a": SimpleClass()}
+    dut["a"].b = dut
+    dict_res = weave(dut).as_dict()
+    roundtrip_res = read_json_dict(json.loads(json.dumps(dict_res)))
+    roundtrip = unweave(roundtrip_res)
+    assert roundtrip["a"].b is roundtrip
@@ -1,7 +1,13 @@
+import types
+
 import pytest
 
-from weaver.unweave import unweave
-from weaver.weave import weave
+from weaver.artefact_registry import ArtefactRegistry
+
+from weaver.data import CacheMarker, PendingArtefactID, find_artefacts
+from weaver.stats import WeaveStats
+from weaver.unweave import unweave, state_restorer, restore_state, clear_resolved_classes
+from weaver.weave import weave, clear_class_documentation
 
 
 class SimpleClass:
@@ -27,6 +33,22 @@ class ClassWithArtefact:
         return 2
 
 
+class ClassWithSetState:
+    def __init__(self, b: int = 5) -> None:
+        self.b = b
+
+    def __setstate__(self, state) -> None:
+        self.b = state["b"] + 1
+
+
+class ClassWithGetAttr:
+    def __init__(self, b: int = 5) -> None:
+        self.b = b
+
+    def __getattr__(self, name):
+        raise AttributeError(name)
+
+
 @pytest.mark.parametrize("dut", [SimpleClass()])
 def test_simple_class(dut) -> None:
     res = weave(dut)
@@ -39,3 +61,119 @@ def test_with_artefact(dut) -> None:
     res = weave(dut)
     roundtrip = unweave(res)
     assert dut == roundtrip
+
+
+def test_shared_reference() -> None:
+    shared = SimpleClass(3)
+    dut = {"first": shared, "second": shared}
+    res = weave(dut)
+    assert isinstance(res.json["second"], CacheMarker)
+    roundtrip = unweave(res)
+    assert roundtrip["first"] == shared
+    assert roundtrip["first"] is roundtrip["second"]
+
+
+def test_recursive_reference() -> None:
+    dut = {"a": {}}
+    dut["a"]["b"] = dut
+    res = weave(dut)
+    roundtrip = unweave(res)
+    assert roundtrip["a"]["b"] is roundtrip
+
+
+def test_cycle_through_serializer_rejected() -> None:
+    inner = SimpleClass(None)
+    dut = (inner,)
+    inner.b = dut
+    with pytest.raises(RuntimeError, match="reference cycle through tuple"):
+        weave(dut)
+    # Entering the cycle through a generically woven object is supported.
+    roundtrip = unweave(weave(inner))
+    assert roundtrip.b[0] is roundtrip
+
+
+def test_shared_list() -> None:
+    shared = [1, SimpleClass(2)]
+    res = weave({"a": shared, "b": shared})
+    assert isinstance(res.json["b"], CacheMarker)
+    roundtrip = unweave(res)
+    assert roundtrip["a"] is roundtrip["b"]
+    assert roundtrip["a"] == shared
+
+
+def test_self_referencing_list() -> None:
+    dut = [1]
+    dut.append(dut)
+    roundtrip = unweave(weave(dut))
+    assert roundtrip[0] == 1
+    assert roundtrip[1] is roundtrip
+
+
+def test_parallel_artefact_writing() -> None:
+    dut = {"steps": [range(i) for i in range(20)], "shared": SimpleClass(range(3))}
+    res = weave(dut, workers=4)
+    assert all(type(a) is not PendingArtefactID or not a.is_pending() for a in find_artefacts(res))
+    assert find_artefacts(res) == find_artefacts(weave(dut))
+    roundtrip = unweave(res)
+    assert roundtrip["steps"] == dut["steps"]
+    assert roundtrip["shared"].b == range(3)
+
+
+def test_documentation_once_per_type() -> None:
+    res = weave({"first": ClassWithArtefact(), "second": ClassWithArtefact()})
+    first, second = res.json["first"], res.json["second"]
+    assert "method_example" in first.method_source
+    assert first.documentation
+    assert second.method_source == {} and second.documentation == {}
+    assert unweave(res)["second"] == ClassWithArtefact()
+
+
+def test_documentation_of_items_with_own_docstring() -> None:
+    clear_class_documentation()
+    own = ClassWithArtefact()
+    own.__doc__ = "Instance docstring"
+    res = weave({"own": own, "plain": ClassWithArtefact(), "m1": types.ModuleType("m1", "First"),
+                 "m2": types.ModuleType("m2", "Second")})
+    docstrings = {
+        key: [ArtefactRegistry().load_from_id(a) for a in node.documentation.values()]
+        for (key, node) in res.json.items()
+    }
+    assert docstrings == {"own": ["Instance docstring"], "plain": [None], "m1": ["First"], "m2": ["Second"]}
+
+
+def test_documentation_skipped() -> None:
+    res = weave({"first": ClassWithArtefact()}, documentation=False)
+    assert res.json["first"].method_source == {}
+    assert res.documentation == {} and res.artefacts == set()
+
+
+@pytest.mark.parametrize(
+    "cls, expected",
+    [
+        (SimpleClass, 5),
+        (ClassWithSetState, 6),
+        (ClassWithGetAttr, 5),
+    ],
+)
+def test_state_restorer(cls, expected) -> None:
+    roundtrip = unweave(weave(cls()))
+    assert type(roundtrip) is cls
+    assert roundtrip.b == expected
+
+
+def test_state_restorer_per_instance() -> None:
+    assert state_restorer(ClassWithGetAttr) is restore_state
+    assert state_restorer(SimpleClass) is not restore_state
+
+
+def test_resolved_classes_shared_across_unweaves() -> None:
+    clear_resolved_classes()
+    res = weave([SimpleClass(i) for i in range(10)])
+    with WeaveStats() as stats:
+        unweave(res)
+        unweave(res)
+    assert stats.phase_counts["identify_class"] == 1
+    clear_resolved_classes()
+    with WeaveStats() as stats:
+        unweave(res)
+    assert stats.phase_counts["identify_class"] == 1
@@ -9,7 +9,7 @@ from weaver.weave import weave
 
 
 @pytest.mark.parametrize("model", [IsolationForest()])
-def test_sklearn_univariate_model(model) -> None:
+def test_sklearn_univariate_model(model, tmp_path) -> None:
     data = np.random.rand(500, 10)
     new_example_data = np.random.rand(500, 10)
     model.fit(data)
@@ -28,7 +28,7 @@ def test_sklearn_univariate_model(model) -> None:
                 roundtrip.predict_proba(new_example_data),
             )
         )
-    with open("D:/weaver-json/ExampleSklearnFile.json", "w") as f:
+    with open(tmp_path / "ExampleSklearnFile.json", "w") as f:
         json.dump(res.as_dict(), f)
-    with open("D:/weaver-json/ExampleSklearnMinimalFile.json", "w") as f:
+    with open(tmp_path / "ExampleSklearnMinimalFile.json", "w") as f:
         json.dump(res.as_minimal_dict(), f)
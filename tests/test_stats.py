@@ -0,0 +1,68 @@
+import numpy as np
+
+from weaver.stats import WeaveStats, active_stats
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def increment(self) -> int:
+        self.count += 1
+        return self.count
+
+
+def test_weave_stats() -> None:
+    shared = np.arange(100, dtype=np.float64)
+    dut = {"a": Counter(), "b": Counter(), "x": shared, "y": shared}
+    stats = WeaveStats(slowest=3)
+    res = weave(dut, stats=stats)
+    assert active_stats() is None
+    assert stats.type_counts["builtins.dict"] == 1
+    assert stats.type_counts["numpy.ndarray"] == 1
+    assert stats.cache_hits == 1
+    assert stats.artefact_bytes_by_type["numpy.ndarray"] == shared.nbytes
+    assert stats.artefact_count >= 1
+    assert {"detect", "getmembers", "save", "pickle", "hash"} <= set(stats.phase_seconds)
+    assert len(stats.slowest()) == 3
+    assert stats.slowest() == sorted(stats.slowest(), reverse=True)
+
+    with WeaveStats() as unweave_stats:
+        unweave(res)
+    assert unweave_stats.type_counts["numpy.ndarray"] == 1
+    assert unweave_stats.cache_hits == 1
+    assert unweave_stats.as_dict()["cache_hit_rate"] > 0
+
+
+def test_stats_disabled() -> None:
+    stats = WeaveStats()
+    weave({"a": Counter()})
+    assert stats.as_dict()["type_counts"] == {}
+
+
+def test_stats_reentrant() -> None:
+    stats = WeaveStats()
+    with stats:
+        weave({"a": Counter()}, stats=stats)
+        assert active_stats() is stats
+        weave({"b": Counter()})
+    assert active_stats() is None
+    assert stats.type_counts["builtins.dict"] == 2
+
+
+def test_stats_from_writer_threads() -> None:
+    # Random content, so each artefact is new to the store and written.
+    dut = [np.random.default_rng().random(100) for _ in range(4)]
+    with WeaveStats() as stats:
+        weave(dut, workers=2)
+    assert stats.phase_counts["hash"] >= 4
+    assert stats.phase_counts["write"] >= 4
+    assert len(stats.artefact_bytes_written) >= 4
+    assert all(size > 0 for size in stats.artefact_bytes_written.values())
+
+    with WeaveStats() as again:
+        weave(dut)
+    assert "write" not in again.phase_counts
+    assert set(again.artefact_bytes_written.values()) == {0}
@@ -0,0 +1,70 @@
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.data import find_artefacts
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+torch = pytest.importorskip("torch")
+
+
+@pytest.mark.parametrize(
+    "dut",
+    [
+        torch.arange(12, dtype=torch.float32).reshape(3, 4),
+        torch.arange(12, dtype=torch.int64).reshape(3, 4).t(),
+        torch.arange(20, dtype=torch.float16).reshape(4, 5)[1:, ::2],
+        torch.ones(3, 2, dtype=torch.bfloat16),
+        torch.tensor(3.5),
+        torch.zeros(0, 3),
+        torch.tensor([1 + 2j, 3 - 4j]).conj(),
+        torch._neg_view(torch.arange(4, dtype=torch.float32)),
+        torch.tensor([1 + 2j, 3 - 4j]).conj().imag,
+    ],
+)
+def test_tensor_roundtrip(dut) -> None:
+    res = weave(dut)
+    assert not res.json["pickled"]
+    roundtrip = unweave(res)
+    assert roundtrip.dtype == dut.dtype
+    assert roundtrip.stride() == dut.stride()
+    assert roundtrip.is_conj() == dut.is_conj() and roundtrip.is_neg() == dut.is_neg()
+    assert torch.equal(roundtrip, dut)
+
+
+def test_tensor_storage_is_raw() -> None:
+    dut = torch.arange(10, dtype=torch.float64)
+    res = weave(dut)
+    payload = ArtefactRegistry().load_payload(res.json["data"])
+    assert bytes(payload) == dut.numpy().tobytes()
+
+
+def test_tied_weights_written_once() -> None:
+    embedding = torch.nn.Parameter(torch.randn(10, 4))
+    state = {"encoder": embedding, "decoder": embedding.data.t(), "bias": torch.zeros(4)}
+    res = weave(state, documentation=False)
+    assert len(find_artefacts(res)) == 2
+    roundtrip = unweave(res)
+    assert isinstance(roundtrip["encoder"], torch.nn.Parameter)
+    assert roundtrip["encoder"].requires_grad
+    assert torch.equal(roundtrip["decoder"], embedding.data.t())
+    with torch.no_grad():
+        roundtrip["encoder"][0, 0] = 100.0
+    assert roundtrip["decoder"][0, 0] == 100.0
+    assert embedding[0, 0] != 100.0
+
+
+def test_equal_storages_not_shared() -> None:
+    state = {"a": torch.zeros(4), "b": torch.zeros(4)}
+    res = weave(state, documentation=False)
+    assert len(find_artefacts(res)) == 1
+    roundtrip = unweave(res)
+    roundtrip["a"][0] = 1.0
+    assert roundtrip["b"][0] == 0.0
+
+
+def test_state_dict_roundtrip() -> None:
+    model = torch.nn.Linear(4, 3)
+    roundtrip = unweave(weave(dict(model.state_dict())))
+    for key, value in model.state_dict().items():
+        assert torch.equal(roundtrip[key], value)
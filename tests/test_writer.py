@@ -0,0 +1,116 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from weaver.artefact_registry import ArtefactRegistry
+from weaver.data import read_json_dict, as_typed_dict
+from weaver.reader import loads
+from weaver.stats import WeaveStats
+from weaver.unweave import unweave, clear_resolved_classes
+from weaver.weave import weave
+from weaver.writer import dump, dumps
+
+
+class SimpleClass:
+    def __init__(self, b) -> None:
+        self.b = b
+
+    def method_example(self) -> int:
+        return 2
+
+
+def _shared():
+    shared = SimpleClass(1)
+    return {"a": shared, "b": shared, 1: 2.5, None: True, "c": (1, "é", None)}
+
+
+def _recursive():
+    dut = {"a": SimpleClass(None)}
+    dut["a"].b = dut
+    return dut
+
+
+@pytest.mark.parametrize(
+    "dut",
+    [
+        SimpleClass(5),
+        _shared(),
+        _recursive(),
+        [SimpleClass(b"123"), {1, 2}, np.arange(3)],
+        range(3),
+    ],
+)
+def test_matches_as_dict(dut) -> None:
+    res = weave(dut)
+    expected = json.dumps(
+        [r.as_dict() for r in res] if isinstance(res, list) else res.as_dict()
+    )
+    assert dumps(res) == expected
+    f = io.StringIO()
+    dump(res, f, chunk_size=16)
+    assert f.getvalue() == expected
+
+
+@pytest.mark.parametrize(
+    "dut",
+    [SimpleClass(5), _shared(), _recursive(), [SimpleClass(b"123"), {1, 2}, np.arange(3)]],
+)
+def test_typed_matches_as_typed_dict(dut) -> None:
+    res = weave(dut)
+    expected = json.dumps(as_typed_dict(res))
+    assert dumps(res, types=True) == expected
+    f = io.StringIO()
+    dump(res, f, chunk_size=16, types=True)
+    assert f.getvalue() == expected
+
+
+def test_typed_writes_each_type_once() -> None:
+    res = weave({"items": [SimpleClass(i) for i in range(50)]})
+    typed = as_typed_dict(res)
+    names = [entry["metadata"]["name"] for entry in typed["types"]]
+    assert sorted(names) == sorted(set(names))
+    assert "SimpleClass" in names
+    entry = typed["types"][names.index("SimpleClass")]
+    assert "method_example" in entry["method_source"]
+    assert "method_source" not in json.dumps(typed["root"])
+
+
+def test_typed_roundtrip_resolves_each_class_once() -> None:
+    res = weave({"items": [SimpleClass(i) for i in range(50)]})
+    loaded = read_json_dict(json.loads(dumps(res, types=True)))
+    clear_resolved_classes()
+    with WeaveStats() as stats:
+        roundtrip = unweave(loaded)
+    assert [item.b for item in roundtrip["items"]] == list(range(50))
+    # Once for the dict, and once for all 50 SimpleClasses.
+    assert stats.phase_counts["identify_class"] == 2
+
+
+def test_typed_roundtrip_keeps_own_docstring() -> None:
+    own = SimpleClass(1)
+    own.__doc__ = "Instance docstring"
+    res = weave({"plain": SimpleClass(0), "own": own, "other": SimpleClass(2)})
+    encoded = dumps(res, types=True)
+    for loaded in [read_json_dict(json.loads(encoded)), loads(encoded)]:
+        docstrings = {
+            key: [ArtefactRegistry().load_from_id(a) for a in node.documentation.values()]
+            for (key, node) in loaded.json.items()
+        }
+        assert docstrings == {"plain": [None], "own": ["Instance docstring"], "other": [None]}
+
+
+def test_deep_nesting() -> None:
+    res = weave(SimpleClass(0))
+    for _ in range(5000):
+        res = [res]
+    encoded = dumps(res)
+    assert encoded.startswith("[" * 5000 + "{")
+    assert encoded.endswith("}" + "]" * 5000)
+
+
+def test_roundtrip() -> None:
+    f = io.StringIO()
+    dump(weave(SimpleClass(7)), f)
+    assert unweave(read_json_dict(json.loads(f.getvalue()))).b == 7
@@ -0,0 +1,94 @@
+"""
+Retrieve artefacts from a remote store into the local ArtefactRegistry concurrently.
+
+Remote artefacts are anything with the `path(directory)` method of `artefact_link.PyArtefact`, which downloads the
+artefact into the directory and returns the path to it. The chunks of a chunked artefact are fetched along with it
+from remote artefacts which also have a `chunk(name)` method, returning the remote artefact for the chunk file of
+that name stored alongside it. Downloads run on threads, at most `concurrency` at once, and are staged within the
+artefact directory so they are moved into place rather than copied.
+"""
+
+from __future__ import annotations
+
+__all__ = ["AsyncArtefactFetcher", "LocalArtefact"]
+
+import asyncio
+import pathlib
+import shutil
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Protocol
+
+from weaver.artefact_registry import ArtefactRegistry, active_artefact_registry
+from weaver.data import ArtefactID
+
+
+class RemoteArtefact(Protocol):
+    def path(self, directory: pathlib.Path) -> pathlib.Path:
+        ...
+
+
+class LocalArtefact:
+    """Stand-in for a PyArtefact, serving an artefact file from the local filesystem, e.g. a shared mount."""
+
+    def __init__(self, source: pathlib.Path) -> None:
+        self.source = pathlib.Path(source)
+
+    def path(self, directory: pathlib.Path) -> pathlib.Path:
+        destination = directory / self.source.name
+        shutil.copyfile(self.source, destination)
+        return destination
+
+    def chunk(self, name: str) -> LocalArtefact:
+        return LocalArtefact(self.source.parent / name)
+
+
+class AsyncArtefactFetcher:
+    def __init__(
+        self,
+        artefact_registry: Optional[ArtefactRegistry] = None,
+        concurrency: int = 8,
+    ) -> None:
+        if artefact_registry is None:
+            artefact_registry = active_artefact_registry()
+        self.artefact_registry = artefact_registry
+        self.concurrency = concurrency
+
+    async def fetch(
+        self, artefact: RemoteArtefact, semaphore: Optional[asyncio.Semaphore] = None
+    ) -> ArtefactID:
+        """Download an artefact into the local store, returning the ID it can be loaded with.
+
+        Downloads sharing a `semaphore` are limited by it, as those within a single `fetch_all` are to `concurrency`.
+        """
+        if semaphore is None:
+            return await asyncio.to_thread(self._fetch, artefact)
+        async with semaphore:
+            return await asyncio.to_thread(self._fetch, artefact)
+
+    def _fetch(self, artefact: RemoteArtefact) -> ArtefactID:
+        staging = self.artefact_registry.base_path / f".partial-{uuid.uuid4().hex}"
+        staging.mkdir()
+        # Remote artefacts which cannot serve chunks are fetched only if their chunks are already in the store.
+        chunk_source = None
+        if hasattr(artefact, "chunk"):
+            chunk_source = lambda name: artefact.chunk(name).path(staging)
+        try:
+            return self.artefact_registry.adopt_file(artefact.path(staging), chunk_source)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    async def fetch_all(self, artefacts: Iterable[RemoteArtefact]) -> List[ArtefactID]:
+        """Download artefacts concurrently. An artefact given more than once is only downloaded once."""
+        artefacts = list(artefacts)
+        # Created per call, as a semaphore is bound to the event loop it is first used in.
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks: Dict[int, asyncio.Task] = {}
+        for artefact in artefacts:
+            if id(artefact) not in tasks:
+                tasks[id(artefact)] = asyncio.ensure_future(self.fetch(artefact, semaphore))
+        await asyncio.gather(*tasks.values())
+        return [tasks[id(artefact)].result() for artefact in artefacts]
+
+    def fetch_all_sync(self, artefacts: Iterable[RemoteArtefact]) -> List[ArtefactID]:
+        """`fetch_all` for callers outside of an event loop."""
+        return asyncio.run(self.fetch_all(artefacts))
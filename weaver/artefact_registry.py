@@ -1,24 +1,822 @@
+from __future__ import annotations
+
+import ctypes
+import itertools
+import json
+import mmap
+import os
 import pathlib
-from typing import Optional, Any
+import struct
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, Future
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import partial
+from typing import Optional, Any, Callable, BinaryIO, Dict, Iterable, Iterator, List, Set, Tuple, Type
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
-from weaver.data import ArtefactID
+from weaver.codec import compress, decompress, decompress_into
+from weaver.data import ArtefactID, PendingArtefactID, IncorrectParseError, find_artefacts
 from weaver.resource import Resource
-from weaver.serializer import serializer_factory
+from weaver.serializer import Serializable, serializer_factory
+from weaver.stats import active_stats, timed
+
+
+_CREATED_DIRECTORIES: Set[pathlib.Path] = set()
+
+# Payloads larger than this are split into chunks of this size, stored once each. None stores every payload whole.
+DEFAULT_CHUNK_SIZE: Optional[int] = None
+# Codec artefacts are compressed with, see weaver.codec. None stores them uncompressed.
+DEFAULT_CODEC: Optional[str] = None
+# Artefacts at least this large are memory-mapped when loaded, others are read. Each mapping holds a file descriptor
+# open for as long as anything built over it, such as an ndarray, is alive.
+MMAP_THRESHOLD = 1 << 20
+# Alignment of artefacts within bundles, and of the buffers artefacts are read into.
+_ALIGNMENT = 64
+_MANIFEST_TAG = "chunked"
+
+
+def _touch(path: pathlib.Path) -> None:
+    """Set the modification time of `path` to now, by the same clock as the release times in the index."""
+    now = time.time_ns()
+    os.utime(path, ns=(now, now))
+
+
+@contextmanager
+def _file_lock(path: pathlib.Path, shared: bool = False) -> Iterator[None]:
+    """Hold a lock on `path`, between processes as well as threads. Windows has no shared locks, so takes it
+    exclusively."""
+    try:
+        f = open(path, "a+b")
+    except FileNotFoundError:
+        # The directory was removed after this process created it, e.g. by a cleanup of temporary files.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, "a+b")
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
 
 
 class ArtefactRegistry:
-    def __init__(self, base_path: Optional[pathlib.Path] = None) -> None:
+    """Content addressed store of artefacts, named by the hash of their contents.
+
+    Content already present is never written again. Which artefacts are still in use is recorded in a small index of
+    reference counts, updated by `track` and `untrack`, which `gc` uses to remove unreferenced artefacts. Writes hold
+    a shared lock on the directory, and index updates and `gc` an exclusive one, so registries in other threads and
+    processes can share the directory.
+
+    With a `chunk_size`, larger payloads are split into fixed size chunks, each stored once however many artefacts
+    contain it. The artefact itself is then a manifest listing its chunks, but is still named by the hash of its
+    content, so the same content has the same ID with any chunk size.
+
+    With a `codec`, payloads are compressed as they are written, but still named by the hash of their uncompressed
+    content, so content already present is found before it is compressed.
+    `codecs` overrides the codec by serializer, e.g. `{RawSerializer: None}` leaves raw buffers uncompressed.
+    Artefacts record their codec, so any registry can read them.
+
+    Used as a context manager, the registry is active within the `with` block: weave, unweave and the serializers
+    save and load artefacts through it, as returned by `active_artefact_registry`, rather than the default registry.
+    """
+
+    def __init__(
+        self,
+        base_path: Optional[pathlib.Path] = None,
+        chunk_size: Optional[int] = None,
+        codec: Optional[str] = None,
+        codecs: Optional[Dict[Type[Serializable], Optional[str]]] = None,
+    ) -> None:
         if base_path is None:
             base_path = pathlib.Path.home() / ".weaver"
         base_path = base_path / "artefacts"
-        base_path.mkdir(parents=True, exist_ok=True)
+        if base_path not in _CREATED_DIRECTORIES:
+            base_path.mkdir(parents=True, exist_ok=True)
+            _CREATED_DIRECTORIES.add(base_path)
         self.base_path = base_path
+        self.index_path = base_path / "index.json"
+        self.lock_path = base_path / ".lock"
+        self.chunk_size = DEFAULT_CHUNK_SIZE if chunk_size is None else chunk_size
+        self.codec = DEFAULT_CODEC if codec is None else codec
+        self.codecs = {} if codecs is None else codecs
+        self._tokens: List[Any] = []
 
     def load_from_id(self, artefact_id: ArtefactID) -> Any:
-        with open(self.base_path / str(artefact_id), "rb") as f:
-            resource = Resource.from_weaver_artefact(f.read())
-            return serializer_factory(resource.tag()).from_resource(None, resource)
+        resource = Resource.from_weaver_artefact(self.load_buffer(artefact_id))
+        return serializer_factory(resource.tag()).from_resource(None, resource)
+
+    def load_buffer(self, artefact_id: ArtefactID) -> memoryview:
+        """Memory-map an artefact, including its tag.
+
+        The mapping is copy-on-write, so buffers built over it are writeable without affecting the file. It is
+        unmapped once every view over it has been released. Artefacts smaller than MMAP_THRESHOLD are read into
+        memory instead, aligned as a mapping would be. If the artefact was read ahead by the
+        ArtefactPrefetcher active in this context, its buffer is returned instead, and artefacts within the
+        ArtefactBundle active in this context are sliced from its mapping. Chunked artefacts are reassembled
+        into a new buffer, as are compressed artefacts, which are decompressed into it.
+        """
+        buffer = None
+        bundle = _ACTIVE_BUNDLE.get()
+        if bundle is not None:
+            buffer = bundle.take(artefact_id)
+        prefetcher = _ACTIVE_PREFETCHER.get()
+        if (
+            buffer is None
+            and prefetcher is not None
+            and prefetcher.artefact_registry.base_path == self.base_path
+        ):
+            buffer = prefetcher.take(artefact_id)
+        if buffer is None:
+            buffer = _read_file(self.path_from_id(artefact_id))
+        header = buffer[: Resource.tag_length_bytes()]
+        if Resource.read_tag(header) == _MANIFEST_TAG:
+            return self._reassemble(Resource.from_weaver_artefact(buffer))
+        codec = Resource.read_codec(header)
+        if codec is not None:
+            return self._decompress(buffer, codec)
+        return buffer
+
+    def _decompress(self, buffer: memoryview, codec: str) -> memoryview:
+        # Compressed payloads are prefixed with their decompressed size, so the buffer can be allocated up front.
+        tag_length = Resource.tag_length_bytes()
+        header = buffer[:tag_length]
+        size = int.from_bytes(buffer[tag_length : tag_length + 8], "little")
+        view = memoryview(bytearray(tag_length + size))
+        view[:tag_length] = Resource.write_tag(
+            Resource.read_tag(header), Resource.read_hash_algorithm(header)
+        )
+        decompress_into(codec, buffer[tag_length + 8 :], view[tag_length:])
+        return view
+
+    def _reassemble(self, manifest_resource: Resource) -> memoryview:
+        manifest = json.loads(bytes(manifest_resource.buffer()))
+        header = Resource.write_tag(manifest["tag"], manifest["hash_algorithm"])
+        view = memoryview(bytearray(len(header) + manifest["size"]))
+        view[: len(header)] = header
+        position = len(header)
+        codec = manifest.get("codec")
+        for chunk_id in manifest["chunks"]:
+            size = min(manifest["chunk_size"], len(view) - position)
+            with open(self._chunk_path(chunk_id, codec), "rb", buffering=0) as f:
+                if codec is None:
+                    _readinto_exactly(f, view[position : position + size])
+                else:
+                    decompress_into(codec, f.read(), view[position : position + size])
+            position += size
+        return view
+
+    def load_payload(self, artefact_id: ArtefactID) -> memoryview:
+        """Memory-map an artefact, returning only the payload after the tag."""
+        return Resource.from_weaver_artefact(self.load_buffer(artefact_id)).buffer()
 
     def save_using_id(self, artefact_id: ArtefactID, item: bytes) -> None:
-        with open(self.base_path / str(artefact_id), "wb") as f:
-            f.write(item)
+        with _file_lock(self.lock_path, shared=True):
+            self._write(artefact_id, lambda f: f.write(item))
+
+    def save_resource(self, resource: Resource) -> ArtefactID:
+        """Write a resource, or hand it to the ArtefactWriter active in this context for the same directory."""
+        artefact_id = timed("save", self._save_resource_to_writer, resource)
+        stats = active_stats()
+        if stats is not None:
+            stats.artefact_saved(resource.buffer().nbytes)
+        return artefact_id
+
+    def _save_resource_to_writer(self, resource: Resource) -> ArtefactID:
+        writer = _ACTIVE_WRITER.get()
+        if writer is not None and writer.artefact_registry.base_path == self.base_path:
+            return writer.submit(resource)
+        return self._save_resource_now(resource)
+
+    def _save_resource_now(self, resource: Resource) -> ArtefactID:
+        # Held until the artefact and any chunks are in place, so gc cannot remove chunks before the manifest exists.
+        with _file_lock(self.lock_path, shared=True):
+            return self._save_resource_locked(resource)
+
+    def _save_resource_locked(self, resource: Resource) -> ArtefactID:
+        # Named by the uncompressed, unchunked content, so the ID is the same however the artefact is stored.
+        artefact_id = ArtefactID(timed("hash", resource.digest))
+        path = self.path_from_id(artefact_id)
+        stats = active_stats()
+        if path.exists():
+            # Marks the content as saved again, so gc keeps it even if its references were released before.
+            _touch(path)
+            if stats is not None:
+                stats.artefact_written(artefact_id.artefact_id, 0)
+            return artefact_id
+        codec = self._codec_for(resource)
+        if self.chunk_size is not None and resource.buffer().nbytes > self.chunk_size:
+            write_fn = lambda f: self._save_chunks(resource, codec).write(f)
+        elif codec is not None:
+            write_fn = partial(self._write_compressed, resource, codec)
+        else:
+            write_fn = resource.write
+        timed("write", self._write_atomic, path, write_fn)
+        if stats is not None:
+            stats.artefact_written(artefact_id.artefact_id, path.stat().st_size)
+        return artefact_id
+
+    def _codec_for(self, resource: Resource) -> Optional[str]:
+        serializer = serializer_factory(resource.tag())
+        if serializer in self.codecs:
+            return self.codecs[serializer]
+        return self.codec
+
+    @staticmethod
+    def _write_compressed(resource: Resource, codec: str, f: BinaryIO) -> None:
+        payload = resource.buffer().cast("B")
+        f.write(Resource.write_tag(resource.tag(), resource.hash_algorithm, codec))
+        f.write(len(payload).to_bytes(8, "little"))
+        f.writelines(compress(codec, payload))
+
+    def _save_chunks(self, resource: Resource, codec: Optional[str]) -> Resource:
+        """Write the payload of a resource as chunks, returning the manifest resource which replaces it.
+
+        Chunks are named by the hash of their uncompressed content, so duplicates are found before compressing them.
+        """
+        payload = resource.buffer().cast("B")
+        chunk_ids = []
+        for start in range(0, len(payload), self.chunk_size):
+            chunk = payload[start : start + self.chunk_size]
+            chunk_id = timed("hash", Resource.hash_chunks, [chunk], resource.hash_algorithm)
+            path = self._chunk_path(chunk_id, codec)
+            if path.exists():
+                _touch(path)
+            else:
+                if codec is None:
+                    self._write_atomic(path, lambda f: f.write(chunk))
+                else:
+                    self._write_atomic(path, lambda f: f.writelines(compress(codec, chunk)))
+            chunk_ids.append(chunk_id)
+        manifest = {
+            "tag": resource.tag(),
+            "hash_algorithm": resource.hash_algorithm,
+            "size": len(payload),
+            "chunk_size": self.chunk_size,
+            "chunks": chunk_ids,
+            "codec": codec,
+        }
+        return Resource(
+            json.dumps(manifest).encode("utf-8"), _MANIFEST_TAG, resource.hash_algorithm
+        )
+
+    def _chunk_path(self, chunk_id: int, codec: Optional[str] = None) -> pathlib.Path:
+        if codec is None:
+            return self.base_path / f"Chunk(_id={chunk_id})"
+        return self.base_path / f"Chunk(_id={chunk_id},codec={codec})"
+
+    def save_buffer(self, buffer: memoryview, tag: str) -> ArtefactID:
+        """Write a buffer as an artefact without first copying it."""
+        return self.save_resource(Resource(buffer, tag))
+
+    def adopt_file(
+        self,
+        path: pathlib.Path,
+        chunk_source: Optional[Callable[[str], pathlib.Path]] = None,
+    ) -> ArtefactID:
+        """Move an artefact file, tag included, into the store, hashing it in pieces rather than reading it whole.
+
+        The artefact is named as when it was saved, by its uncompressed content with any chunks put back together.
+        Chunks of a chunked artefact which are not yet in the store are found with `chunk_source`, which is given
+        the name of each chunk file and returns a path to it, and are adopted along with the artefact.
+        """
+        with open(path, "rb") as f:
+            header = f.read(Resource.tag_length_bytes())
+            manifest = json.loads(f.read()) if Resource.read_tag(header) == _MANIFEST_TAG else None
+        staged: Dict[str, pathlib.Path] = {}
+        if manifest is not None:
+            # Fetched before taking the lock, so gc is not held up by downloads.
+            for name in self._manifest_chunk_names(manifest):
+                if not (self.base_path / name).exists():
+                    staged[name] = self._fetch_chunk(name, chunk_source)
+        with _file_lock(self.lock_path, shared=True):
+            if manifest is None:
+                artefact_id = ArtefactID(self._hash_file(path, header))
+            else:
+                artefact_id = ArtefactID(self._hash_chunked(manifest, staged, chunk_source))
+                for (name, chunk_path) in staged.items():
+                    self._move_chunk_into_place(chunk_path, self.base_path / name)
+            self._move_into_place(path, artefact_id)
+        return artefact_id
+
+    def _manifest_chunk_names(self, manifest: Dict[str, Any]) -> List[str]:
+        return [self._chunk_path(chunk_id, manifest.get("codec")).name for chunk_id in manifest["chunks"]]
+
+    @staticmethod
+    def _fetch_chunk(name: str, chunk_source: Optional[Callable[[str], pathlib.Path]]) -> pathlib.Path:
+        if chunk_source is None:
+            raise IncorrectParseError(f"Chunk {name} is not in the store, and there is nowhere to fetch it from")
+        return chunk_source(name)
+
+    @staticmethod
+    def _hash_file(path: pathlib.Path, header: bytes) -> int:
+        hash_algorithm = Resource.read_hash_algorithm(header)
+        codec = Resource.read_codec(header)
+        with open(path, "rb") as f:
+            if codec is None:
+                f.seek(len(header))
+                pieces = itertools.chain([header], iter(partial(f.read, 1 << 20), b""))
+                return Resource.hash_chunks(pieces, hash_algorithm)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # Hashed as saved, with the tag's codec removed and the decompressed payload in place of the size.
+                plain_header = Resource.write_tag(Resource.read_tag(header), hash_algorithm)
+                compressed = memoryview(mapped)[Resource.tag_length_bytes() + 8 :]
+                try:
+                    pieces = itertools.chain([plain_header], decompress(codec, compressed))
+                    return Resource.hash_chunks(pieces, hash_algorithm)
+                finally:
+                    compressed.release()
+
+    def _hash_chunked(
+        self,
+        manifest: Dict[str, Any],
+        staged: Dict[str, pathlib.Path],
+        chunk_source: Optional[Callable[[str], pathlib.Path]],
+    ) -> int:
+        hash_algorithm = manifest["hash_algorithm"]
+        codec = manifest.get("codec")
+
+        def pieces() -> Iterator[bytes]:
+            yield Resource.write_tag(manifest["tag"], hash_algorithm)
+            for (chunk_id, name) in zip(manifest["chunks"], self._manifest_chunk_names(manifest)):
+                chunk_path = self.base_path / name
+                if name in staged:
+                    chunk_path = staged[name]
+                elif not chunk_path.exists():
+                    # Removed by gc since it was found to be in the store.
+                    chunk_path = staged[name] = self._fetch_chunk(name, chunk_source)
+                chunk = chunk_path.read_bytes()
+                if codec is not None:
+                    chunk = b"".join(decompress(codec, memoryview(chunk)))
+                if Resource.hash_chunks([chunk], hash_algorithm) != chunk_id:
+                    raise IncorrectParseError(f"Chunk {name} does not match its ID")
+                yield chunk
+
+        return Resource.hash_chunks(pieces(), hash_algorithm)
+
+    @staticmethod
+    def _move_chunk_into_place(path: pathlib.Path, destination: pathlib.Path) -> None:
+        if destination.exists():
+            os.unlink(path)
+            _touch(destination)
+        else:
+            os.replace(path, destination)
+
+    def _move_into_place(self, path: pathlib.Path, artefact_id: ArtefactID) -> None:
+        if self.exists(artefact_id):
+            os.unlink(path)
+            _touch(self.path_from_id(artefact_id))
+        else:
+            os.replace(path, self.path_from_id(artefact_id))
+
+    def path_from_id(self, artefact_id: ArtefactID) -> pathlib.Path:
+        return self.base_path / f"ArtefactID(_id={artefact_id.artefact_id})"
+
+    def exists(self, artefact_id: ArtefactID) -> bool:
+        return self.path_from_id(artefact_id).exists()
+
+    def _write(self, artefact_id: ArtefactID, write_fn: Callable[[BinaryIO], Any]) -> None:
+        path = self.path_from_id(artefact_id)
+        if path.exists():
+            # Marks the content as saved again, so gc keeps it even if its references were released before.
+            _touch(path)
+            return
+        # Write to a temporary file first, so a partially written artefact is never mistaken for existing content.
+        self._write_atomic(path, write_fn)
+
+    def _write_atomic(self, path: pathlib.Path, write_fn: Callable[[BinaryIO], Any]) -> None:
+        temporary_path = self.base_path / f".partial-{uuid.uuid4().hex}"
+        try:
+            with open(temporary_path, "xb") as f:
+                write_fn(f)
+            os.replace(temporary_path, path)
+        except BaseException:
+            temporary_path.unlink(missing_ok=True)
+            raise
+
+    def _read_index(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _write_index(self, index: Dict[str, Dict[str, int]]) -> None:
+        self._write_atomic(self.index_path, lambda f: f.write(json.dumps(index).encode("utf-8")))
+
+    def references(self, artefact_id: ArtefactID) -> int:
+        return self._read_index().get(str(artefact_id.artefact_id), {}).get("references", 0)
+
+    def add_references(self, artefact_ids: Iterable[ArtefactID], count: int = 1) -> None:
+        with _file_lock(self.lock_path):
+            index = self._read_index()
+            for artefact_id in set(artefact_ids):
+                entry = index.setdefault(
+                    str(artefact_id.artefact_id), {"size": 0, "references": 0}
+                )
+                if self.exists(artefact_id):
+                    entry["size"] = self.path_from_id(artefact_id).stat().st_size
+                entry["references"] = max(entry["references"] + count, 0)
+                if entry["references"] == 0:
+                    entry["released"] = time.time_ns()
+                else:
+                    entry.pop("released", None)
+            self._write_index(index)
+
+    def remove_references(self, artefact_ids: Iterable[ArtefactID]) -> None:
+        self.add_references(artefact_ids, count=-1)
+
+    def track(self, woven: Any) -> None:
+        """Record that a woven item, usually a saved manifest, references each of its artefacts."""
+        self.add_references(find_artefacts(woven))
+
+    def untrack(self, woven: Any) -> None:
+        """Release the references added by `track`, so unused artefacts can be removed by `gc`."""
+        self.remove_references(find_artefacts(woven))
+
+    def gc(self, untracked: bool = False) -> List[ArtefactID]:
+        """Remove artefacts which are no longer referenced, returning their ids.
+
+        By default only artefacts which have been tracked and then fully released are removed. Those saved again since
+        their release, e.g. by a weave still to be tracked, are kept and become untracked. With `untracked`, artefacts
+        which were never tracked are removed as well.
+        """
+        with _file_lock(self.lock_path):
+            return self._gc_locked(untracked)
+
+    def _gc_locked(self, untracked: bool) -> List[ArtefactID]:
+        index = self._read_index()
+        removed = []
+        for key, entry in list(index.items()):
+            if entry["references"] > 0:
+                continue
+            artefact_id = ArtefactID(int(key))
+            del index[key]
+            if not self._saved_since(artefact_id, entry.get("released")):
+                removed.append(artefact_id)
+        if untracked:
+            tracked = {self.path_from_id(ArtefactID(int(key))).name for key in index}
+            removed.extend(
+                ArtefactID(int(path.name[len("ArtefactID(_id=") : -1]))
+                for path in self.base_path.glob("ArtefactID(_id=*)")
+                if path.name not in tracked
+            )
+        for artefact_id in removed:
+            self.path_from_id(artefact_id).unlink(missing_ok=True)
+        self._write_index(index)
+        self._remove_unused_chunks()
+        return removed
+
+    def _saved_since(self, artefact_id: ArtefactID, released: Optional[int]) -> bool:
+        if released is None:
+            return False
+        try:
+            return self.path_from_id(artefact_id).stat().st_mtime_ns >= released
+        except FileNotFoundError:
+            return False
+
+    def _remove_unused_chunks(self) -> None:
+        chunk_paths = list(self.base_path.glob("Chunk(_id=*)"))
+        if not chunk_paths:
+            return
+        used = set()
+        for path in self.base_path.glob("ArtefactID(_id=*)"):
+            with open(path, "rb") as f:
+                if Resource.read_tag(f.read(Resource.tag_length_bytes())) == _MANIFEST_TAG:
+                    manifest = json.loads(f.read())
+                    used.update(
+                        self._chunk_path(chunk_id, manifest.get("codec")).name
+                        for chunk_id in manifest["chunks"]
+                    )
+        for path in chunk_paths:
+            if path.name not in used:
+                path.unlink(missing_ok=True)
+
+
+    def __enter__(self) -> ArtefactRegistry:
+        self._tokens.append(_ACTIVE_REGISTRY.set(self))
+        return self
+
+    def __exit__(self, *args) -> None:
+        _ACTIVE_REGISTRY.reset(self._tokens.pop())
+
+
+_ACTIVE_REGISTRY: ContextVar[Optional[ArtefactRegistry]] = ContextVar(
+    "weaver_artefact_registry", default=None
+)
+
+
+def active_artefact_registry() -> ArtefactRegistry:
+    """The ArtefactRegistry active in this context, or otherwise the default one, in ~/.weaver."""
+    artefact_registry = _ACTIVE_REGISTRY.get()
+    if artefact_registry is None:
+        return ArtefactRegistry()
+    return artefact_registry
+
+
+def _read_file(path: pathlib.Path) -> memoryview:
+    with open(path, "rb", buffering=0) as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+        view = _aligned_buffer(size)
+        _readinto_exactly(f, view)
+        return view
+
+
+def _aligned_buffer(size: int) -> memoryview:
+    """A writeable buffer starting on a 64 byte boundary, so payloads after the tag are as aligned as if mapped."""
+    buffer = bytearray(size + _ALIGNMENT)
+    offset = -ctypes.addressof(ctypes.c_char.from_buffer(buffer)) % _ALIGNMENT
+    return memoryview(buffer)[offset : offset + size]
+
+
+def _readinto_exactly(f: BinaryIO, view: memoryview) -> None:
+    read = 0
+    while read < len(view):
+        count = f.readinto(view[read:])
+        if not count:
+            raise EOFError(f"{f.name} was truncated")
+        read += count
+
+
+class ArtefactWriter:
+    """Hashes and writes artefacts on a thread pool while active as a context manager.
+
+    Within the `with` block, `ArtefactRegistry.save_resource` for the same directory returns a PendingArtefactID
+    immediately, and the resource is hashed and written in the background. At most `max_pending_bytes` of payloads
+    are held waiting to be written, beyond which `submit` blocks. Every PendingArtefactID has been resolved once the
+    block exits.
+    """
+
+    def __init__(
+        self,
+        artefact_registry: ArtefactRegistry,
+        workers: int,
+        max_pending_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.artefact_registry = artefact_registry
+        self.max_pending_bytes = max_pending_bytes
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weaver-artefact")
+        self._pending: List[PendingArtefactID] = []
+        self._pending_bytes = 0
+        self._condition = threading.Condition()
+        self._token = None
+
+    def submit(self, resource: Resource) -> PendingArtefactID:
+        size = resource.buffer().nbytes
+        with self._condition:
+            # A single resource larger than the limit is still accepted once nothing else is pending.
+            self._condition.wait_for(
+                lambda: self._pending_bytes == 0
+                or self._pending_bytes + size <= self.max_pending_bytes
+            )
+            self._pending_bytes += size
+        # The worker runs in a copy of this context, so an active WeaveStats records the hashing and writing.
+        artefact_id = PendingArtefactID(
+            self._executor.submit(copy_context().run, self._save, resource, size)
+        )
+        self._pending.append(artefact_id)
+        return artefact_id
+
+    def _save(self, resource: Resource, size: int) -> ArtefactID:
+        try:
+            return self.artefact_registry._save_resource_now(resource)
+        finally:
+            with self._condition:
+                self._pending_bytes -= size
+                self._condition.notify_all()
+
+    def __enter__(self) -> ArtefactWriter:
+        self._token = _ACTIVE_WRITER.set(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        _ACTIVE_WRITER.reset(self._token)
+        self._executor.shutdown(wait=True)
+        for artefact_id in self._pending:
+            artefact_id.resolve()
+        self._pending = []
+
+
+_ACTIVE_WRITER: ContextVar[Optional[ArtefactWriter]] = ContextVar(
+    "weaver_artefact_writer", default=None
+)
+
+
+class ArtefactPrefetcher:
+    """Reads artefacts ahead of their use on a thread pool while active as a context manager.
+
+    Artefacts are read in the order given, into writeable buffers which `ArtefactRegistry.load_buffer` hands out in
+    place of memory-mapping the file. At most `max_buffered_bytes` are held waiting to be used. Each buffer is handed
+    out once, so repeated loads of the same artefact do not share memory; later loads, and artefacts which have not
+    been read yet, are read directly instead of waiting.
+    """
+
+    def __init__(
+        self,
+        artefact_registry: ArtefactRegistry,
+        artefact_ids: Iterable[ArtefactID],
+        workers: int,
+        max_buffered_bytes: int = 512 * 1024 * 1024,
+    ) -> None:
+        self.artefact_registry = artefact_registry
+        self.max_buffered_bytes = max_buffered_bytes
+        self._order = list(dict.fromkeys(artefact_ids))
+        # Scheduled reads, or None for artefacts which have already been taken.
+        self._reads: Dict[ArtefactID, Optional[Tuple[Future, int]]] = {}
+        self._buffered_bytes = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weaver-prefetch")
+        self._feeder = threading.Thread(target=self._feed, daemon=True)
+        self._token = None
+
+    def _feed(self) -> None:
+        for artefact_id in self._order:
+            try:
+                size = self.artefact_registry.path_from_id(artefact_id).stat().st_size
+            except OSError:
+                continue
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closed
+                    or self._buffered_bytes == 0
+                    or self._buffered_bytes + size <= self.max_buffered_bytes
+                )
+                if self._closed:
+                    return
+                if artefact_id in self._reads:
+                    continue
+                self._buffered_bytes += size
+                self._reads[artefact_id] = (
+                    self._executor.submit(self._read, artefact_id, size),
+                    size,
+                )
+
+    def _read(self, artefact_id: ArtefactID, size: int) -> memoryview:
+        view = memoryview(bytearray(size))
+        with open(self.artefact_registry.path_from_id(artefact_id), "rb", buffering=0) as f:
+            _readinto_exactly(f, view)
+        return view
+
+    def take(self, artefact_id: ArtefactID) -> Optional[memoryview]:
+        """The prefetched buffer for an artefact, or None if it should be read directly."""
+        with self._condition:
+            read = self._reads.get(artefact_id)
+            self._reads[artefact_id] = None
+        if read is None:
+            return None
+        future, size = read
+        try:
+            return future.result()
+        except Exception:
+            return None
+        finally:
+            with self._condition:
+                self._buffered_bytes -= size
+                self._condition.notify_all()
+
+    def __enter__(self) -> ArtefactPrefetcher:
+        self._token = _ACTIVE_PREFETCHER.set(self)
+        self._feeder.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        _ACTIVE_PREFETCHER.reset(self._token)
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._feeder.join()
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._reads = {}
+
+
+_ACTIVE_PREFETCHER: ContextVar[Optional[ArtefactPrefetcher]] = ContextVar(
+    "weaver_artefact_prefetcher", default=None
+)
+
+
+_BUNDLE_MAGIC = b"WEAVERB\x01"
+# Magic, then the offset and length of the manifest, and of the artefact index.
+_BUNDLE_HEADER = struct.Struct("<8sQQQQ")
+
+
+class ArtefactBundle:
+    """A single file holding a woven manifest and every artefact it references.
+
+    The file starts with a fixed size header locating the manifest and an index of artefact offsets and lengths,
+    both JSON, at its end. Artefacts are stored with their tags, decompressed and reassembled from any chunks, each
+    aligned to 64 bytes. The whole file is memory-mapped once; while active as a context manager,
+    `ArtefactRegistry.load_buffer` returns slices of that mapping for the artefacts it holds. An artefact taken
+    again, such as equal arrays sharing its content, is copied, or sliced from a mapping of its own if at least
+    MMAP_THRESHOLD, so writes to one do not appear in the other.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        self._path = path
+        self._buffer = self._map()
+        if len(self._buffer) < _BUNDLE_HEADER.size:
+            raise IncorrectParseError(f"{path} is not a weaver bundle")
+        magic, manifest_offset, manifest_length, index_offset, index_length = (
+            _BUNDLE_HEADER.unpack_from(self._buffer)
+        )
+        if magic != _BUNDLE_MAGIC:
+            raise IncorrectParseError(f"{path} is not a weaver bundle")
+        self.manifest = self._buffer[manifest_offset : manifest_offset + manifest_length]
+        index = json.loads(bytes(self._buffer[index_offset : index_offset + index_length]))
+        self._index: Dict[int, Tuple[int, int]] = {
+            int(key): (offset, length) for (key, (offset, length)) in index.items()
+        }
+        self._taken: Set[int] = set()
+        self._lock = threading.Lock()
+        self._token = None
+
+    def _map(self) -> memoryview:
+        with open(self._path, "rb") as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY))
+
+    def take(self, artefact_id: ArtefactID) -> Optional[memoryview]:
+        """The artefact, tag included, or None if it is not within the bundle."""
+        entry = self._index.get(artefact_id.artefact_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        with self._lock:
+            taken = artefact_id.artefact_id in self._taken
+            self._taken.add(artefact_id.artefact_id)
+        if not taken:
+            return self._buffer[offset : offset + length]
+        if length >= MMAP_THRESHOLD:
+            return self._map()[offset : offset + length]
+        view = _aligned_buffer(length)
+        view[:] = self._buffer[offset : offset + length]
+        return view
+
+    def __contains__(self, artefact_id: ArtefactID) -> bool:
+        return artefact_id.artefact_id in self._index
+
+    @staticmethod
+    def write(
+        path: pathlib.Path,
+        manifest: bytes,
+        artefact_ids: Iterable[ArtefactID],
+        artefact_registry: ArtefactRegistry,
+    ) -> None:
+        path = pathlib.Path(path)
+        temporary_path = path.with_name(f".{path.name}.partial-{uuid.uuid4().hex}")
+        try:
+            with open(temporary_path, "xb") as f:
+                f.write(bytes(_BUNDLE_HEADER.size))
+                index = {}
+                for artefact_id in dict.fromkeys(artefact_ids):
+                    f.write(bytes(-f.tell() % _ALIGNMENT))
+                    buffer = artefact_registry.load_buffer(artefact_id)
+                    index[str(artefact_id.artefact_id)] = [f.tell(), len(buffer)]
+                    f.write(buffer)
+                manifest_offset = f.tell()
+                f.write(manifest)
+                index_offset = f.tell()
+                encoded_index = json.dumps(index).encode("utf-8")
+                f.write(encoded_index)
+                f.seek(0)
+                f.write(
+                    _BUNDLE_HEADER.pack(
+                        _BUNDLE_MAGIC,
+                        manifest_offset,
+                        len(manifest),
+                        index_offset,
+                        len(encoded_index),
+                    )
+                )
+            os.replace(temporary_path, path)
+        except BaseException:
+            temporary_path.unlink(missing_ok=True)
+            raise
+
+    def __enter__(self) -> ArtefactBundle:
+        self._token = _ACTIVE_BUNDLE.set(self)
+        return self
+
+    def __exit__(self, *args) -> None:
+        _ACTIVE_BUNDLE.reset(self._token)
+
+
+_ACTIVE_BUNDLE: ContextVar[Optional[ArtefactBundle]] = ContextVar(
+    "weaver_artefact_bundle", default=None
+)
@@ -0,0 +1,181 @@
+"""
+Compact binary encoding of woven items, using MessagePack.
+
+An alternative to the JSON from `WovenClass.as_dict`, for manifests that are large or read often. The metadata of
+each type is written once, to a table ahead of the item, and every node refers to it by index. Nodes are maps with
+small integer keys rather than repeating their field names. The JSON encoding remains the readable form.
+
+Requires the `msgpack` package, installed with the `binary` extra.
+"""
+
+from __future__ import annotations
+
+__all__ = ["dumps", "dump", "loads", "load", "read_file"]
+
+import pathlib
+from typing import Any, BinaryIO, Dict, List, Union
+
+from weaver.data import (
+    WovenClass,
+    ArtefactID,
+    CacheMarker,
+    ItemMetadata,
+    ItemMetadataWithVersion,
+    IncorrectParseError,
+    TypeTable,
+)
+from weaver.version import UnknownVersion
+
+_FORMAT = "weaver-binary"
+_FORMAT_VERSION = 1
+
+# Keys of the maps nodes are written as. Maps decoded from the woven JSON only ever have string keys.
+_TYPE, _POINTER, _ARTEFACTS, _DOCUMENTATION, _METHOD_SOURCE, _JSON = range(6)
+_ARTEFACT_ID = -1
+_CACHE_MARKER = -2
+
+# Extension type for integers outside of MessagePack's 64 bit range, such as artefact IDs.
+_BIG_INT = 1
+_INT_MIN, _INT_MAX = -(2**63), 2**64 - 1
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise RuntimeError(
+            "The binary encoding requires msgpack, installed with weaver[binary]"
+        ) from None
+    return msgpack
+
+
+class _Encoder:
+    def __init__(self, msgpack: Any) -> None:
+        self._msgpack = msgpack
+        # Interns types as the typed JSON form does, although documentation is kept on its nodes.
+        self.table = TypeTable()
+
+    def int(self, value: int) -> Any:
+        if _INT_MIN <= value <= _INT_MAX:
+            return value
+        return self._msgpack.ExtType(
+            _BIG_INT, value.to_bytes(value.bit_length() // 8 + 1, "big", signed=True)
+        )
+
+    def encode(self, item: Any) -> Any:
+        if isinstance(item, WovenClass):
+            return {
+                _TYPE: self.table.ref(item.metadata),
+                _POINTER: self.int(item.pointer),
+                _ARTEFACTS: [self.encode(artefact) for artefact in item.artefacts],
+                _DOCUMENTATION: [
+                    [self.table.ref(_with_version(key)), self.encode(value)]
+                    for (key, value) in item.documentation.items()
+                ],
+                _METHOD_SOURCE: item.method_source,
+                _JSON: self.encode(item.json),
+            }
+        if isinstance(item, ArtefactID):
+            return {_ARTEFACT_ID: self.int(item.artefact_id)}
+        if isinstance(item, CacheMarker):
+            return {_CACHE_MARKER: self.int(item.pointer)}
+        if isinstance(item, bool) or item is None:
+            return item
+        if isinstance(item, int):
+            return self.int(item)
+        if isinstance(item, (list, tuple)):
+            return [self.encode(value) for value in item]
+        if isinstance(item, Dict):
+            # Keys are written as strings, as they would be in JSON.
+            return {
+                key if isinstance(key, str) else _json_key(key): self.encode(value)
+                for (key, value) in item.items()
+            }
+        return item
+
+
+def _with_version(metadata: ItemMetadata) -> ItemMetadataWithVersion:
+    """Documentation keys are ItemMetadataWithVersion when woven, but ItemMetadata once read from JSON. Only their
+    module and name are read back, so those without a version are interned with an unknown one."""
+    if isinstance(metadata, ItemMetadataWithVersion):
+        return metadata
+    return ItemMetadataWithVersion(metadata.module, metadata.name, UnknownVersion())
+
+
+def _json_key(key: Any) -> str:
+    if key is True:
+        return "true"
+    if key is False:
+        return "false"
+    if key is None:
+        return "null"
+    return str(key)
+
+
+def dumps(item: Union[WovenClass, ArtefactID, CacheMarker, List]) -> bytes:
+    msgpack = _msgpack()
+    encoder = _Encoder(msgpack)
+    root = encoder.encode(item)
+    types = [metadata.as_dict() for metadata in encoder.table.metadata]
+    header = {"format": _FORMAT, "version": _FORMAT_VERSION, "types": types}
+    return msgpack.packb(header, use_bin_type=True) + msgpack.packb(root, use_bin_type=True)
+
+
+def dump(item: Union[WovenClass, ArtefactID, CacheMarker, List], fp: BinaryIO) -> None:
+    fp.write(dumps(item))
+
+
+def loads(data: Union[bytes, memoryview]) -> Union[WovenClass, ArtefactID, CacheMarker, List, Any]:
+    msgpack = _msgpack()
+    types: List[ItemMetadataWithVersion] = []
+
+    def ext_hook(code: int, data: bytes) -> Any:
+        if code == _BIG_INT:
+            return int.from_bytes(data, "big", signed=True)
+        return msgpack.ExtType(code, data)
+
+    def object_hook(item: Dict[Any, Any]) -> Any:
+        if _TYPE in item:
+            return WovenClass(
+                pointer=item[_POINTER],
+                metadata=types[item[_TYPE]],
+                artefacts=set(item[_ARTEFACTS]),
+                documentation={
+                    types[type_ref].without_version(): value
+                    for (type_ref, value) in item[_DOCUMENTATION]
+                },
+                method_source=item[_METHOD_SOURCE],
+                json=item[_JSON],
+            )
+        if _ARTEFACT_ID in item:
+            return ArtefactID(item[_ARTEFACT_ID])
+        if _CACHE_MARKER in item:
+            return CacheMarker(item[_CACHE_MARKER])
+        return item
+
+    unpacker = msgpack.Unpacker(
+        raw=False,
+        strict_map_key=False,
+        object_hook=object_hook,
+        ext_hook=ext_hook,
+        max_buffer_size=max(len(data), 1 << 20),
+    )
+    unpacker.feed(data)
+    header = unpacker.unpack()
+    if not isinstance(header, Dict) or header.get("format") != _FORMAT:
+        raise IncorrectParseError("Not a binary woven item")
+    if header["version"] > _FORMAT_VERSION:
+        raise IncorrectParseError(
+            f"Binary woven item has version {header['version']}, newer than {_FORMAT_VERSION}"
+        )
+    types.extend(ItemMetadataWithVersion.read(metadata) for metadata in header["types"])
+    return unpacker.unpack()
+
+
+def load(fp: BinaryIO) -> Union[WovenClass, ArtefactID, CacheMarker, List, Any]:
+    return loads(fp.read())
+
+
+def read_file(file: Union[str, pathlib.Path]) -> Union[WovenClass, ArtefactID, CacheMarker, List, Any]:
+    with open(file, "rb") as f:
+        return load(f)
@@ -0,0 +1,74 @@
+"""
+Save and load woven items as single file bundles, holding the woven JSON, in its typed form, and every artefact it
+references.
+
+A bundle can be copied as one file, and is loaded with a single memory map rather than a file per artefact.
+"""
+
+from __future__ import annotations
+
+__all__ = ["save", "write", "read", "load"]
+
+import pathlib
+from typing import Any, List, Optional, Union
+
+from weaver import reader, writer
+from weaver.artefact_registry import ArtefactBundle, ArtefactRegistry, active_artefact_registry
+from weaver.data import ArtefactID, WovenClass, iter_artefacts
+from weaver.registry import WeaverRegistry
+from weaver.unweave import unweave
+from weaver.weave import weave
+
+
+def save(
+    item: Any,
+    path: Union[str, pathlib.Path],
+    registry: Optional[WeaverRegistry] = None,
+    workers: Optional[int] = None,
+    documentation: Optional[bool] = None,
+    artefact_registry: Optional[ArtefactRegistry] = None,
+) -> Union[WovenClass, ArtefactID, List]:
+    """Weave an item and write it to a bundle, returning the woven item."""
+    woven = weave(
+        item,
+        registry,
+        workers=workers,
+        documentation=documentation,
+        artefact_registry=artefact_registry,
+    )
+    write(woven, path, artefact_registry)
+    return woven
+
+
+def write(
+    woven: Union[WovenClass, ArtefactID, List],
+    path: Union[str, pathlib.Path],
+    artefact_registry: Optional[ArtefactRegistry] = None,
+) -> None:
+    """Write an already woven item to a bundle, copying its artefacts out of the ArtefactRegistry."""
+    if artefact_registry is None:
+        artefact_registry = active_artefact_registry()
+    ArtefactBundle.write(
+        pathlib.Path(path),
+        writer.dumps(woven, types=True).encode("utf-8"),
+        iter_artefacts(woven),
+        artefact_registry,
+    )
+
+
+def read(path: Union[str, pathlib.Path]) -> Union[WovenClass, ArtefactID, List]:
+    """Read the woven item from a bundle, without unweaving it."""
+    return reader.loads(bytes(ArtefactBundle(pathlib.Path(path)).manifest))
+
+
+def load(
+    path: Union[str, pathlib.Path], registry: Optional[WeaverRegistry] = None
+) -> Any:
+    """Unweave the item within a bundle. Its artefacts are read from the bundle rather than the ArtefactRegistry.
+
+    Arrays and tensors are views over the bundle's memory map, which is copy-on-write, so they can be modified
+    without affecting the file.
+    """
+    bundle = ArtefactBundle(pathlib.Path(path))
+    with bundle:
+        return unweave(reader.loads(bytes(bundle.manifest)), registry)
@@ -0,0 +1,141 @@
+"""
+Compression codecs for artefacts, applied by the ArtefactRegistry as artefacts are written and read.
+
+zlib is always available. zstd and lz4 are available when the `zstandard` and `lz4` packages are installed.
+Compression and decompression both work through a payload in slices, so neither needs a second full copy of it.
+"""
+
+from __future__ import annotations
+
+__all__ = ["Codec", "register_codec", "available_codecs", "compress", "decompress", "decompress_into"]
+
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+_SLICE_BYTES = 1 << 20
+
+
+@dataclass(frozen=True)
+class Codec:
+    """Factories for streaming compressors, with `compress(data)` and `flush()`, and decompressors.
+
+    Decompressors bound the size of each piece they return through `decompress(data, max_length)`, either leaving
+    the rest of the input in `unconsumed_tail`, like `zlib.decompressobj`, or holding it until called with no input
+    while `needs_input` is False, like `bz2.BZ2Decompressor`. Codecs whose decompressors cannot bound their output
+    give `decompress_pieces(data, max_length)` instead, yielding the decompressed pieces.
+    """
+
+    compressor: Callable[[], Any]
+    decompressor: Optional[Callable[[], Any]] = None
+    decompress_pieces: Optional[Callable[[memoryview, int], Iterator[bytes]]] = None
+
+
+_CODECS: Dict[str, Codec] = {
+    "zlib": Codec(lambda: zlib.compressobj(6), zlib.decompressobj),
+}
+
+try:
+    import zstandard
+
+    _CODECS["zstd"] = Codec(
+        lambda: zstandard.ZstdCompressor().compressobj(),
+        decompress_pieces=lambda data, max_length: zstandard.ZstdDecompressor().read_to_iter(
+            data, write_size=max_length
+        ),
+    )
+except ImportError:
+    pass
+
+try:
+    import lz4.frame
+
+    class _Lz4Compressor:
+        def __init__(self) -> None:
+            self._compressor = lz4.frame.LZ4FrameCompressor()
+            self._started = False
+
+        def _begin(self) -> bytes:
+            if self._started:
+                return b""
+            self._started = True
+            return self._compressor.begin()
+
+        def compress(self, data: Any) -> bytes:
+            return self._begin() + self._compressor.compress(data)
+
+        def flush(self) -> bytes:
+            return self._begin() + self._compressor.flush()
+
+    _CODECS["lz4"] = Codec(_Lz4Compressor, lz4.frame.LZ4FrameDecompressor)
+except ImportError:
+    pass
+
+
+def register_codec(name: str, codec: Codec) -> None:
+    _CODECS[name] = codec
+
+
+def available_codecs() -> List[str]:
+    return list(_CODECS)
+
+
+def _get_codec(name: str) -> Codec:
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise RuntimeError(
+            f"Unknown codec {name}, is the package providing it installed?"
+        ) from None
+
+
+def compress(name: str, data: memoryview) -> Iterator[bytes]:
+    """Yield the compressed form of `data` in pieces."""
+    compressor = _get_codec(name).compressor()
+    data = memoryview(data).cast("B")
+    for start in range(0, len(data), _SLICE_BYTES):
+        piece = compressor.compress(data[start : start + _SLICE_BYTES])
+        if piece:
+            yield piece
+    yield compressor.flush()
+
+
+def _decompressed_pieces(codec: Codec, data: memoryview) -> Iterator[bytes]:
+    if codec.decompress_pieces is not None:
+        yield from codec.decompress_pieces(data, _SLICE_BYTES)
+        return
+    decompressor = codec.decompressor()
+    for start in range(0, len(data), _SLICE_BYTES):
+        piece = data[start : start + _SLICE_BYTES]
+        if hasattr(decompressor, "unconsumed_tail"):
+            while piece:
+                yield decompressor.decompress(piece, _SLICE_BYTES)
+                piece = decompressor.unconsumed_tail
+        else:
+            yield decompressor.decompress(piece, _SLICE_BYTES)
+            while not decompressor.needs_input and not decompressor.eof:
+                yield decompressor.decompress(b"", _SLICE_BYTES)
+    if hasattr(decompressor, "flush"):
+        yield decompressor.flush()
+
+
+def decompress(name: str, data: memoryview) -> Iterator[bytes]:
+    """Yield the decompressed form of `data` in pieces of bounded size."""
+    return _decompressed_pieces(_get_codec(name), memoryview(data).cast("B"))
+
+
+def decompress_into(name: str, data: memoryview, view: memoryview) -> None:
+    """Decompress `data` into `view`, which must be exactly the decompressed size.
+
+    The decompressed data is produced in pieces of bounded size, so however compressible the data, no more than one
+    piece is held besides `view`.
+    """
+    codec = _get_codec(name)
+    position = 0
+    for piece in _decompressed_pieces(codec, memoryview(data).cast("B")):
+        if position + len(piece) > len(view):
+            raise RuntimeError("Artefact decompressed to more than its recorded size")
+        view[position : position + len(piece)] = piece
+        position += len(piece)
+    if position != len(view):
+        raise RuntimeError("Artefact decompressed to less than its recorded size")
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import weakref
+from concurrent.futures import Future
 from dataclasses import dataclass
 from typing import (
     Set,
@@ -7,10 +9,13 @@ from typing import (
     Dict,
     Union,
     Tuple,
+    Optional,
+    Iterator,
+    List,
 )
 
 import weaver
-from weaver.version import Versioning, AllVersions, Version, UnknownVersion
+from weaver.version import Versioning, AllVersions, Version, UnknownVersion, VersionRange
 
 
 class IncorrectParseError(BaseException):
@@ -27,6 +32,12 @@ def read_json_dict(
         return [read_json_dict(i) for i in item]
     if not isinstance(item, Dict):
         return item
+    if TypeTable.is_typed_dict(item):
+        return TypeTable.read(item["types"]).read_json(item["root"])
+    if CacheMarker.is_marker(item):
+        return CacheMarker.from_dict(item)
+    if ArtefactID.is_artefact(item):
+        return ArtefactID.from_dict(item)
     for key in ["pointer", "metadata", "artefacts", "documentation", "json"]:
         if key not in item:
             if "_id" in item:
@@ -38,7 +49,7 @@ def read_json_dict(
             metadata=ItemMetadataWithVersion.read(item["metadata"]),
             artefacts=set([ArtefactID.from_dict(x) for x in item["artefacts"]]),
             documentation={
-                ItemMetadata.read(key): value
+                ItemMetadata.read(key): read_json_dict(value)
                 for (key, value) in item["documentation"].items()
             },
             method_source=item["method_source"],
@@ -49,24 +60,69 @@ def read_json_dict(
         )
 
 
+def iter_artefacts(item: Any, documentation: bool = True) -> Iterator[ArtefactID]:
+    """ArtefactIDs referenced within a woven tree, in the order they are reached when unweaving.
+
+    Each WovenClass's artefacts are included, and its documentation unless `documentation` is False. IDs
+    referenced more than once are yielded each time.
+    """
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, ArtefactID):
+            yield item
+        elif isinstance(item, WovenClass):
+            if documentation:
+                children = list(item.artefacts) + list(item.documentation.values())
+            else:
+                documented = set(item.documentation.values())
+                children = [a for a in item.artefacts if a not in documented]
+            stack.extend(reversed(children + list(item.json.values())))
+        elif isinstance(item, Dict):
+            stack.extend(reversed(list(item.values())))
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
+        elif isinstance(item, set):
+            stack.extend(item)
+
+
+def find_artefacts(item: Any) -> Set[ArtefactID]:
+    """All ArtefactIDs referenced within a woven tree, including each WovenClass's artefacts."""
+    return set(iter_artefacts(item))
+
+
 @dataclass
 class ArtefactID:
     _id: int
 
+    @staticmethod
+    def metadata() -> ItemMetadataWithVersion:
+        return ItemMetadataWithVersion(
+            module=tuple(["weaver", "data"]),
+            name="ArtefactID",
+            version=Version(*weaver.__version__),
+        )
+
     def as_dict(self) -> Dict[str, Any]:
         return WovenClass(
             pointer=id(self),
-            metadata=ItemMetadataWithVersion(
-                module=tuple(["weaver", "data"]),
-                name="ArtefactID",
-                version=Version(*weaver.__version__),
-            ),
+            metadata=self.metadata(),
             artefacts=set(),
             documentation={},
             method_source={},
             json={"_id": self._id},
         ).as_dict()
     
+    @staticmethod
+    def is_artefact(item: Dict[str, Any]) -> bool:
+        metadata = item.get("metadata")
+        return (
+            isinstance(metadata, Dict)
+            and metadata.get("module") == ["weaver", "data"]
+            and metadata.get("name") == "ArtefactID"
+            and "_id" in item.get("json", {})
+        )
+
     @staticmethod
     def from_dict(item: dict) -> ArtefactID:
         return ArtefactID(
@@ -81,6 +137,41 @@ class ArtefactID:
         return self._id
 
 
+class PendingArtefactID(ArtefactID):
+    """An ArtefactID whose content is still being hashed, typically on another thread.
+
+    Until it is resolved it is only equal to itself, and hashes by identity. Sets holding it must be rebuilt once it
+    has been resolved, as its hash then changes to that of the ArtefactID.
+    """
+
+    def __init__(self, future: Future) -> None:
+        super().__init__(_id=None)
+        self._future = future
+
+    def resolve(self) -> ArtefactID:
+        if self._future is not None:
+            self._id = self._future.result().artefact_id
+            self._future = None
+        return self
+
+    def is_pending(self) -> bool:
+        return self._future is not None
+
+    def __eq__(self, other: Any) -> bool:
+        if self.is_pending() or (
+            isinstance(other, PendingArtefactID) and other.is_pending()
+        ):
+            return self is other
+        if isinstance(other, ArtefactID):
+            return self._id == other._id
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        if self.is_pending():
+            return id(self)
+        return self._id
+
+
 @dataclass
 class ItemMetadata:
     module: Tuple[str]
@@ -91,14 +182,7 @@ class ItemMetadata:
 
     @staticmethod
     def detect(item: Any) -> ItemMetadata:
-        name = getattr(item, "__name__", getattr(item.__class__, "__name__"))
-        module = tuple(
-            getattr(item, "__module__", getattr(item.__class__, "__module__")).split(
-                "."
-            )
-        )
-        top_level_module = __import__(module[0], globals(), locals(), [], 0)
-        return ItemMetadata(module=module, name=name)
+        return ItemMetadataWithVersion.detect(item).without_version()
 
     @staticmethod
     def read(item: Dict[str, Union[Tuple[str], str]] | str) -> ItemMetadata:
@@ -123,18 +207,32 @@ class ItemMetadata:
         )
 
 
+# Metadata found by ItemMetadataWithVersion.detect, keyed by the class it names. Items which carry a name of their
+# own, such as functions and modules, are not cached, so entries are bounded by the classes still alive.
+_DETECTED_METADATA: "weakref.WeakKeyDictionary[type, ItemMetadataWithVersion]" = weakref.WeakKeyDictionary()
+
+
 @dataclass
 class ItemMetadataWithVersion(ItemMetadata):
     version: Versioning
 
     @staticmethod
     def detect(item: Any) -> ItemMetadataWithVersion:
-        name = getattr(item, "__name__", getattr(item.__class__, "__name__"))
-        module = tuple(
-            getattr(item, "__module__", getattr(item.__class__, "__module__")).split(
-                "."
-            )
-        )
+        item_class = item if isinstance(item, type) else type(item)
+        try:
+            return _DETECTED_METADATA[item_class]
+        except KeyError:
+            pass
+        # Classes, functions, and modules carry their own name, so the type alone is not a safe key.
+        name = getattr(item, "__name__", None) or item.__class__.__name__
+        module = getattr(item, "__module__", None) or item.__class__.__module__
+        metadata = ItemMetadataWithVersion._detect_uncached(tuple(module.split(".")), name)
+        if name == item_class.__name__ and module == item_class.__module__:
+            _DETECTED_METADATA[item_class] = metadata
+        return metadata
+
+    @staticmethod
+    def _detect_uncached(module: Tuple[str], name: str) -> ItemMetadataWithVersion:
         top_level_module = __import__(module[0], globals(), locals(), [], 0)
         version = getattr(top_level_module, "__version__", None)
         if version is None:
@@ -143,6 +241,20 @@ class ItemMetadataWithVersion(ItemMetadata):
             version = Version.from_str(version)
         return ItemMetadataWithVersion(module=module, name=name, version=version)
 
+    @staticmethod
+    def clear_detected(module: Optional[str] = None) -> None:
+        """Forget detected metadata, e.g. after a module has been reloaded with a new version.
+
+        With a `module`, only entries from that top level module, or its submodules, are removed.
+        """
+        if module is None:
+            _DETECTED_METADATA.clear()
+            return
+        for key, metadata in list(_DETECTED_METADATA.items()):
+            detected_module = ".".join(metadata.module)
+            if detected_module == module or detected_module.startswith(f"{module}."):
+                del _DETECTED_METADATA[key]
+
     def without_version(self) -> ItemMetadata:
         return ItemMetadata(self.module, self.name)
 
@@ -156,6 +268,8 @@ class ItemMetadataWithVersion(ItemMetadata):
             version = AllVersions()
         elif item["version"] == "UnknownVersion":
             version = UnknownVersion()
+        elif VersionRange.is_range(item["version"]):
+            version = VersionRange.from_str(item["version"])
         else:
             version = Version.from_str(item["version"])
         return ItemMetadataWithVersion(tuple(item["module"]), item["name"], version)
@@ -182,7 +296,7 @@ class WovenClass:
 
     @classmethod
     def _convert(cls, item) -> Any:
-        if isinstance(item, (WovenClass, ArtefactID)):
+        if isinstance(item, (WovenClass, ArtefactID, CacheMarker)):
             return item.as_dict()
         elif isinstance(item, list):
             return [cls._convert(i) for i in item]
@@ -203,6 +317,8 @@ class WovenClass:
             return item.as_minimal_dict()
         elif isinstance(item, ArtefactID):
             return f"ArtefactID: {item.artefact_id}"
+        elif isinstance(item, CacheMarker):
+            return f"CacheMarker: {item.pointer}"
         elif isinstance(item, list):
             return [cls._minimal_convert(i) for i in item]
         elif isinstance(item, set):
@@ -218,7 +334,6 @@ class WovenClass:
             return item
 
     def as_dict(self) -> Dict[str, Any]:
-        # TODO: Move Documentation into a single top level object - potentially move into Artefacts?
         return {
             "pointer": self.pointer,
             "metadata": self.metadata.as_dict(),
@@ -238,25 +353,228 @@ class WovenClass:
 
 @dataclass
 class CacheMarker:
+    """Back-reference to an item already woven elsewhere in the same tree.
+
+    The `_id` matches the `pointer` of the WovenClass written for the first occurrence of the item.
+    """
+
     _id: int
 
-    def __write__(self) -> WovenClass:
+    @staticmethod
+    def metadata() -> ItemMetadataWithVersion:
+        return ItemMetadataWithVersion(
+            module=tuple(["weaver", "data"]),
+            name="CacheMarker",
+            version=Version(*weaver.__version__),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
         return WovenClass(
             pointer=self._id,
-            metadata=ItemMetadataWithVersion(
-                module=tuple(["weaver", "data"]),
-                name="CacheMarker",
-                version=weaver.__version__,
-            ),
+            metadata=self.metadata(),
             artefacts=set(),
             documentation={},
-            json={},
+            method_source={},
+            json={"_id": self._id},
+        ).as_dict()
+
+    @staticmethod
+    def is_marker(item: Dict[str, Any]) -> bool:
+        metadata = item.get("metadata")
+        return (
+            isinstance(metadata, Dict)
+            and metadata.get("module") == ["weaver", "data"]
+            and metadata.get("name") == "CacheMarker"
         )
 
     @staticmethod
-    def read(item: Dict[str, Any]) -> CacheMarker:
-        for key in ["__artefact_id__"]:
-            if key not in item:
-                print(f"key {key=} not in item")
-                raise IncorrectParseError
-        return CacheMarker(item["__artefact_id__"])
+    def from_dict(item: Dict[str, Any]) -> CacheMarker:
+        if "_id" not in item.get("json", {}):
+            print(f"key '_id' not in {item=}")
+            raise IncorrectParseError
+        return CacheMarker(item["json"]["_id"])
+
+    @property
+    def pointer(self) -> int:
+        return self._id
+
+
+# Keys of a WovenClass node in the typed form, which refers to its type by index rather than holding its metadata.
+_TYPED_NODE_KEYS = frozenset(["pointer", "type", "artefacts", "json"])
+# Keys a node holds only when its documentation or method source differs from that of its type's table entry.
+_TYPED_NODE_OWN_KEYS = frozenset(["documentation", "method_source"])
+
+
+class TypeTable:
+    """The metadata, documentation and method source of each type within a woven tree.
+
+    Used for the typed form of the woven JSON, `{"types": [...], "root": ...}`, in which each type is written once to
+    the table and every node refers to it by index. WovenClass nodes are written as `{"pointer", "type", "artefacts",
+    "json"}`, and ArtefactIDs and CacheMarkers as `{"type", "json"}`. The table holds the first documentation and
+    method source found for each type; a node whose own differ, such as an instance with its own docstring, also
+    holds them under `documentation` and `method_source`. When read back, every other WovenClass of a type shares
+    the metadata, documentation and method source of its table entry. These dictionaries are the same objects for
+    every such node, so must be treated as read-only; copy them before changing a node's documentation.
+    """
+
+    def __init__(self) -> None:
+        self.metadata: List[ItemMetadataWithVersion] = []
+        self.documentation: List[Dict[ItemMetadata, Any]] = []
+        self.method_source: List[Dict[str, str]] = []
+        self._refs: Dict[ItemMetadataWithVersion, int] = {}
+
+    def ref(self, metadata: ItemMetadataWithVersion) -> int:
+        """The index of the entry for `metadata`, which is added if it is not yet in the table."""
+        try:
+            return self._refs[metadata]
+        except KeyError:
+            self._refs[metadata] = len(self.metadata)
+            self.metadata.append(metadata)
+            self.documentation.append({})
+            self.method_source.append({})
+            return self._refs[metadata]
+
+    @classmethod
+    def collect(cls, item: Any) -> TypeTable:
+        """The table of every type within a woven tree, in the order they are first reached."""
+        table = cls()
+        artefact_metadata = ArtefactID.metadata()
+        marker_metadata = CacheMarker.metadata()
+        stack = [item]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, WovenClass):
+                ref = table.ref(item.metadata)
+                # Weave only documents the first instance of each type, and those with documentation of their own.
+                if item.documentation and not table.documentation[ref]:
+                    table.documentation[ref] = item.documentation
+                stack.extend(item.documentation.values())
+                if item.method_source and not table.method_source[ref]:
+                    table.method_source[ref] = item.method_source
+                stack.append(item.json)
+                stack.extend(item.artefacts)
+            elif isinstance(item, ArtefactID):
+                table.ref(artefact_metadata)
+            elif isinstance(item, CacheMarker):
+                table.ref(marker_metadata)
+            elif isinstance(item, Dict):
+                stack.extend(reversed(list(item.values())))
+            elif isinstance(item, (list, tuple)):
+                stack.extend(reversed(item))
+            elif isinstance(item, set):
+                stack.extend(item)
+        return table
+
+    def as_list(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "metadata": metadata.as_dict(),
+                "documentation": {
+                    key.to_str(): self.convert(value) for (key, value) in documentation.items()
+                },
+                "method_source": method_source,
+            }
+            for (metadata, documentation, method_source) in zip(
+                self.metadata, self.documentation, self.method_source
+            )
+        ]
+
+    @classmethod
+    def read(cls, entries: List[Dict[str, Any]]) -> TypeTable:
+        table = cls()
+        for entry in entries:
+            metadata = ItemMetadataWithVersion.read(entry["metadata"])
+            table._refs.setdefault(metadata, len(table.metadata))
+            table.metadata.append(metadata)
+            table.documentation.append({})
+            table.method_source.append({})
+        # Documentation may refer to entries later in the table, e.g. that of ArtefactID.
+        for ref, entry in enumerate(entries):
+            table.documentation[ref] = {
+                ItemMetadata.read(key): table.read_json(value)
+                for (key, value) in entry["documentation"].items()
+            }
+            table.method_source[ref] = entry["method_source"]
+        return table
+
+    def node_dict(self, item: Union[WovenClass, ArtefactID, CacheMarker]) -> Dict[str, Any]:
+        """The typed form of a node, whose `json` and `artefacts` are still to be converted."""
+        if isinstance(item, WovenClass):
+            ref = self._refs[item.metadata]
+            node = {"pointer": item.pointer, "type": ref, "artefacts": list(item.artefacts)}
+            if item.documentation and item.documentation != self.documentation[ref]:
+                node["documentation"] = {
+                    key.to_str(): value for (key, value) in item.documentation.items()
+                }
+            if item.method_source and item.method_source != self.method_source[ref]:
+                node["method_source"] = item.method_source
+            node["json"] = item.json
+            return node
+        return {"type": self._refs[item.metadata()], "json": {"_id": item._id}}
+
+    def convert(self, item: Any) -> Any:
+        if isinstance(item, (WovenClass, ArtefactID, CacheMarker)):
+            return {key: self.convert(value) for (key, value) in self.node_dict(item).items()}
+        elif isinstance(item, list):
+            return [self.convert(i) for i in item]
+        elif isinstance(item, set):
+            return {self.convert(i) for i in item}
+        elif isinstance(item, tuple):
+            return tuple([self.convert(i) for i in item])
+        elif isinstance(item, Dict):
+            return {
+                WovenClass._convert(key): self.convert(value) for (key, value) in item.items()
+            }
+        else:
+            return item
+
+    def read_node(self, item: Dict[str, Any]) -> Any:
+        """The WovenClass, ArtefactID or CacheMarker for a typed node whose contents have already been read.
+
+        Unless the node holds its own, a WovenClass's `documentation` and `method_source` are those of the table
+        entry, shared with every other node of its type, and are not to be modified. Dictionaries which are not typed
+        nodes are returned unchanged.
+        """
+        ref = item.get("type")
+        if type(ref) is not int or not 0 <= ref < len(self.metadata) or "json" not in item:
+            return item
+        metadata = self.metadata[ref]
+        if _TYPED_NODE_KEYS <= item.keys() <= _TYPED_NODE_KEYS | _TYPED_NODE_OWN_KEYS:
+            documentation = self.documentation[ref]
+            if "documentation" in item:
+                documentation = {
+                    ItemMetadata.read(key): value for (key, value) in item["documentation"].items()
+                }
+            return WovenClass(
+                pointer=item["pointer"],
+                metadata=metadata,
+                artefacts=set(item["artefacts"]),
+                documentation=documentation,
+                method_source=item.get("method_source", self.method_source[ref]),
+                json=item["json"],
+            )
+        if len(item) != 2 or not isinstance(item["json"], Dict) or "_id" not in item["json"]:
+            return item
+        if metadata.module == ("weaver", "data") and metadata.name == "ArtefactID":
+            return ArtefactID(item["json"]["_id"])
+        if metadata.module == ("weaver", "data") and metadata.name == "CacheMarker":
+            return CacheMarker(item["json"]["_id"])
+        return item
+
+    def read_json(self, item: Any) -> Any:
+        """Read a typed tree decoded from JSON, as `read_json_dict` does for the untyped form."""
+        if isinstance(item, list):
+            return [self.read_json(i) for i in item]
+        if not isinstance(item, Dict):
+            return item
+        return self.read_node({key: self.read_json(value) for (key, value) in item.items()})
+
+    @staticmethod
+    def is_typed_dict(item: Dict[str, Any]) -> bool:
+        return item.keys() == {"types", "root"} and isinstance(item["types"], list)
+
+
+def as_typed_dict(item: Union[WovenClass, ArtefactID, CacheMarker, List]) -> Dict[str, Any]:
+    """Convert a woven item to the typed form, in which each type is written once to a table. See TypeTable."""
+    table = TypeTable.collect(item)
+    return {"types": table.as_list(), "root": table.convert(item)}
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+__all__ = ["LazyArtefact", "resolve", "is_loaded"]
+
+import operator
+from typing import Any, Optional
+
+from weaver.artefact_registry import ArtefactRegistry, active_artefact_registry
+from weaver.data import ArtefactID
+
+_UNLOADED = object()
+
+
+class LazyArtefact:
+    """Stands in for an artefact, loading it from the ArtefactRegistry the first time it is used.
+
+    Attribute access, operators, and `isinstance` checks are all forwarded to the loaded item.
+    """
+
+    __slots__ = ("_artefact_id", "_artefact_registry", "_item")
+
+    def __init__(
+        self,
+        artefact_id: ArtefactID,
+        artefact_registry: Optional[ArtefactRegistry] = None,
+    ) -> None:
+        object.__setattr__(self, "_artefact_id", artefact_id)
+        object.__setattr__(self, "_artefact_registry", artefact_registry)
+        object.__setattr__(self, "_item", _UNLOADED)
+
+    @property
+    def __wrapped__(self) -> Any:
+        item = object.__getattribute__(self, "_item")
+        if item is _UNLOADED:
+            artefact_registry = object.__getattribute__(self, "_artefact_registry")
+            if artefact_registry is None:
+                artefact_registry = active_artefact_registry()
+            item = artefact_registry.load_from_id(
+                object.__getattribute__(self, "_artefact_id")
+            )
+            object.__setattr__(self, "_item", item)
+        return item
+
+    @property
+    def __class__(self) -> type:
+        return type(self.__wrapped__)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__wrapped__, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.__wrapped__, name, value)
+
+    def __delattr__(self, name: str) -> None:
+        delattr(self.__wrapped__, name)
+
+    def __dir__(self):
+        return dir(self.__wrapped__)
+
+    def __repr__(self) -> str:
+        if not is_loaded(self):
+            artefact_id = object.__getattribute__(self, "_artefact_id")
+            return f"<LazyArtefact {artefact_id.artefact_id} (not loaded)>"
+        return repr(self.__wrapped__)
+
+    def __str__(self) -> str:
+        return str(self.__wrapped__)
+
+    def __bytes__(self) -> bytes:
+        return bytes(self.__wrapped__)
+
+    def __format__(self, format_spec: str) -> str:
+        return format(self.__wrapped__, format_spec)
+
+    def __hash__(self) -> int:
+        return hash(self.__wrapped__)
+
+    def __bool__(self) -> bool:
+        return bool(self.__wrapped__)
+
+    def __len__(self) -> int:
+        return len(self.__wrapped__)
+
+    def __iter__(self):
+        return iter(self.__wrapped__)
+
+    def __reversed__(self):
+        return reversed(self.__wrapped__)
+
+    def __contains__(self, item: Any) -> bool:
+        return item in self.__wrapped__
+
+    def __getitem__(self, key: Any) -> Any:
+        return self.__wrapped__[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        self.__wrapped__[key] = value
+
+    def __delitem__(self, key: Any) -> None:
+        del self.__wrapped__[key]
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self.__wrapped__(*args, **kwargs)
+
+    def __int__(self) -> int:
+        return int(self.__wrapped__)
+
+    def __float__(self) -> float:
+        return float(self.__wrapped__)
+
+    def __index__(self) -> int:
+        return operator.index(self.__wrapped__)
+
+    def __neg__(self) -> Any:
+        return -self.__wrapped__
+
+    def __pos__(self) -> Any:
+        return +self.__wrapped__
+
+    def __abs__(self) -> Any:
+        return abs(self.__wrapped__)
+
+    def __invert__(self) -> Any:
+        return ~self.__wrapped__
+
+    def __enter__(self) -> Any:
+        return self.__wrapped__.__enter__()
+
+    def __exit__(self, *args) -> Any:
+        return self.__wrapped__.__exit__(*args)
+
+    def __array__(self, *args, **kwargs) -> Any:
+        return self.__wrapped__.__array__(*args, **kwargs)
+
+    def __reduce_ex__(self, protocol: int) -> Any:
+        return self.__wrapped__.__reduce_ex__(protocol)
+
+
+def _forward_binary(op):
+    def forward(self, other):
+        return op(self.__wrapped__, resolve(other))
+
+    def reflected(self, other):
+        return op(resolve(other), self.__wrapped__)
+
+    return forward, reflected
+
+
+for _name, _op in [
+    ("eq", operator.eq),
+    ("ne", operator.ne),
+    ("lt", operator.lt),
+    ("le", operator.le),
+    ("gt", operator.gt),
+    ("ge", operator.ge),
+]:
+    setattr(LazyArtefact, f"__{_name}__", _forward_binary(_op)[0])
+
+for _name, _op in [
+    ("add", operator.add),
+    ("sub", operator.sub),
+    ("mul", operator.mul),
+    ("matmul", operator.matmul),
+    ("truediv", operator.truediv),
+    ("floordiv", operator.floordiv),
+    ("mod", operator.mod),
+    ("pow", operator.pow),
+    ("lshift", operator.lshift),
+    ("rshift", operator.rshift),
+    ("and", operator.and_),
+    ("or", operator.or_),
+    ("xor", operator.xor),
+]:
+    _forward, _reflected = _forward_binary(_op)
+    setattr(LazyArtefact, f"__{_name}__", _forward)
+    setattr(LazyArtefact, f"__r{_name}__", _reflected)
+
+
+def resolve(item: Any) -> Any:
+    """Return the loaded item behind a LazyArtefact, or the item itself if it is not lazy."""
+    if type(item) is LazyArtefact:
+        return item.__wrapped__
+    return item
+
+
+def is_loaded(item: Any) -> bool:
+    """False only for a LazyArtefact which has not been accessed yet."""
+    if type(item) is LazyArtefact:
+        return object.__getattribute__(item, "_item") is not _UNLOADED
+    return True
@@ -1,16 +1,201 @@
+"""
+Read woven JSON straight into WovenClass, ArtefactID and CacheMarker objects.
+
+Objects are converted as the JSON decoder produces them, rather than decoding a full dictionary tree and then rebuilding
+it with `read_json_dict`. A `key_path` selects a single subtree; everything outside of it is skipped over as raw bytes
+without being decoded.
+
+Both the untyped form, from `WovenClass.as_dict`, and the typed form, from `as_typed_dict`, are read. For the typed
+form, the TypeTable is decoded first and nodes are converted against it.
+
+A subtree may contain CacheMarkers referring to items outside of it, which cannot be unwoven on their own.
+"""
+
+from __future__ import annotations
+
+__all__ = ["loads", "load", "read_file"]
+
 import json
+import mmap
+import pathlib
+import re
+from typing import Union, Dict, Any, Optional, Sequence, BinaryIO, TextIO
 
-from typing import Union, Dict, Any
+from weaver.data import (
+    WovenClass,
+    ArtefactID,
+    CacheMarker,
+    ItemMetadata,
+    ItemMetadataWithVersion,
+    IncorrectParseError,
+    TypeTable,
+)
 
-from weaver.data import WovenClass, ArtefactID, IncorrectParseError
+KeyPath = Sequence[Union[str, int]]
 
+_WOVEN_CLASS_KEYS = frozenset(["pointer", "metadata", "artefacts", "documentation", "json"])
+_WHITESPACE = re.compile(rb"[ \t\n\r]*")
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(rb"[^,\]}\s]+")
+_STRUCTURE = re.compile(rb'[\[\]{}"]')
+_TYPED = re.compile(rb'[ \t\n\r]*\{[ \t\n\r]*"types"[ \t\n\r]*:')
 
-def read_file(file: str) -> Union[ArtefactID, WovenClass]:
-    json_file: Dict[str, Any] = json.loads(file)
-    try:
-        item = ArtefactID.read(json_file)
+
+def _object_hook(item: Dict[str, Any]) -> Any:
+    if CacheMarker.is_marker(item):
+        return CacheMarker.from_dict(item)
+    if ArtefactID.is_artefact(item):
+        return ArtefactID.from_dict(item)
+    if not _WOVEN_CLASS_KEYS.issubset(item.keys()):
         return item
-    except IncorrectParseError:
-        pass
-    # Assume Dicts will always be converted to WovenClasses.
-    return WovenClass.read(json_file)
+    return WovenClass(
+        pointer=item["pointer"],
+        metadata=ItemMetadataWithVersion.read(item["metadata"]),
+        artefacts=set(item["artefacts"]),
+        documentation={
+            ItemMetadata.read(key): value for (key, value) in item["documentation"].items()
+        },
+        method_source=item.get("method_source", {}),
+        json=item["json"],
+    )
+
+
+def _skip_whitespace(data: Union[bytes, mmap.mmap], position: int) -> int:
+    return _WHITESPACE.match(data, position).end()
+
+
+def _expect(data: Union[bytes, mmap.mmap], position: int, token: bytes) -> int:
+    position = _skip_whitespace(data, position)
+    if data[position : position + 1] != token:
+        raise IncorrectParseError(f"Expected {token!r} at byte {position}")
+    return position + 1
+
+
+def _skip_value(data: Union[bytes, mmap.mmap], position: int) -> int:
+    """Return the position just after the JSON value starting at `position`, without decoding it."""
+    position = _skip_whitespace(data, position)
+    first = data[position : position + 1]
+    if first == b'"':
+        return _STRING.match(data, position).end()
+    if first not in (b"{", b"["):
+        return _SCALAR.match(data, position).end()
+    depth = 0
+    while True:
+        match = _STRUCTURE.search(data, position)
+        if match is None:
+            raise IncorrectParseError("Unterminated JSON value")
+        token = match.group()
+        if token == b'"':
+            position = _STRING.match(data, match.start()).end()
+            continue
+        position = match.end()
+        depth += 1 if token in (b"{", b"[") else -1
+        if depth == 0:
+            return position
+
+
+def _find_member(data: Union[bytes, mmap.mmap], position: int, key: str) -> int:
+    """Return the position of the value for `key` within the object starting at `position`."""
+    position = _expect(data, position, b"{")
+    while True:
+        position = _skip_whitespace(data, position)
+        if data[position : position + 1] == b"}":
+            raise KeyError(key)
+        string = _STRING.match(data, position)
+        if string is None:
+            raise IncorrectParseError(f"Expected an object key at byte {position}")
+        position = _expect(data, string.end(), b":")
+        if json.loads(string.group()) == key:
+            return position
+        position = _skip_whitespace(data, _skip_value(data, position))
+        if data[position : position + 1] == b",":
+            position += 1
+
+
+def _find_element(data: Union[bytes, mmap.mmap], position: int, index: int) -> int:
+    """Return the position of the element at `index` within the array starting at `position`."""
+    position = _expect(data, position, b"[")
+    position = _skip_whitespace(data, position)
+    if data[position : position + 1] == b"]":
+        raise IndexError(index)
+    for _ in range(index):
+        position = _skip_whitespace(data, _skip_value(data, position))
+        if data[position : position + 1] != b",":
+            raise IndexError(index)
+        position += 1
+    return position
+
+
+def _find_inner_element(data: Union[bytes, mmap.mmap], position: int, index: int) -> int:
+    """Return the position of the element at `index` of the list, tuple or set whose fields start at `position`.
+
+    Their elements are held under "__inner__"; other nodes are indexed by the key as a string, as JSON keys are.
+    """
+    try:
+        inner = _find_member(data, position, "__inner__")
+    except KeyError:
+        return _find_member(data, position, str(index))
+    return _find_element(data, _skip_whitespace(data, inner), index)
+
+
+def _find_subtree(data: Union[bytes, mmap.mmap], key_path: KeyPath, position: int = 0) -> slice:
+    for key in key_path:
+        position = _skip_whitespace(data, position)
+        if data[position : position + 1] == b"[":
+            position = _find_element(data, position, int(key))
+            continue
+        # Every object in a woven file is a node, whose fields are held under "json".
+        position = _find_member(data, position, "json")
+        position = _skip_whitespace(data, position)
+        if data[position : position + 1] == b"[":
+            position = _find_element(data, position, int(key))
+        elif isinstance(key, int):
+            position = _find_inner_element(data, position, key)
+        else:
+            position = _find_member(data, position, str(key))
+    position = _skip_whitespace(data, position)
+    return slice(position, _skip_value(data, position))
+
+
+def _decode(
+    data: Union[bytes, mmap.mmap], key_path: Optional[KeyPath]
+) -> Union[WovenClass, ArtefactID, CacheMarker, list, Any]:
+    if _TYPED.match(data) is None:
+        if key_path:
+            data = data[_find_subtree(data, key_path)]
+        return json.loads(data, object_hook=_object_hook)
+    position = _find_member(data, 0, "types")
+    table = TypeTable.read(json.loads(data[position : _skip_value(data, position)]))
+    position = _find_member(data, 0, "root")
+    return json.loads(
+        data[_find_subtree(data, key_path or (), position)], object_hook=table.read_node
+    )
+
+
+def loads(
+    data: Union[str, bytes], key_path: Optional[KeyPath] = None
+) -> Union[WovenClass, ArtefactID, CacheMarker, list, Any]:
+    """Read woven JSON from a string, optionally only the subtree at `key_path`.
+
+    `key_path` holds the keys of successive WovenClass fields, and indices into lists.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return _decode(data, key_path)
+
+
+def load(
+    fp: Union[BinaryIO, TextIO], key_path: Optional[KeyPath] = None
+) -> Union[WovenClass, ArtefactID, CacheMarker, list, Any]:
+    return loads(fp.read(), key_path)
+
+
+def read_file(
+    file: Union[str, pathlib.Path], key_path: Optional[KeyPath] = None
+) -> Union[WovenClass, ArtefactID, CacheMarker, list, Any]:
+    """Read a woven JSON file. With a `key_path`, the file is memory-mapped and only the subtree is decoded."""
+    with open(file, "rb") as f:
+        if not key_path:
+            return loads(f.read())
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return _decode(data, key_path)
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import ast
+import bisect
+import math
 from dataclasses import dataclass, field
 from typing import (
     Dict,
@@ -16,11 +18,25 @@ from typing import (
     Set,
 )
 
-from weaver.data import ItemMetadata, WovenClass, ItemMetadataWithVersion, ArtefactID
-from weaver.version import Versioning, AllVersions
+import numpy as np
+import pyarrow as pa
+
+from weaver.artefact_registry import active_artefact_registry
+from weaver.data import (
+    ItemMetadata,
+    WovenClass,
+    ItemMetadataWithVersion,
+    ArtefactID,
+    IncorrectParseError,
+)
+from weaver.serializer import PickleSerializer, RawSerializer
+from weaver.version import Versioning, AllVersions, Version, VersionRange
 
 T = TypeVar("T")
 
+# Dispatch entry for items whose own name decides their serializer, rather than their type (e.g. classes).
+_BY_METADATA: Any = object()
+
 
 class WeaverSerde:
     @classmethod
@@ -31,6 +47,10 @@ class WeaverSerde:
 
 class WeaverSerializer(Generic[T], WeaverSerde):
     _metadata: ItemMetadataWithVersion
+    # Whether subclasses of T without a serializer of their own should be woven by this serializer.
+    _include_subclasses: bool = False
+    # Whether the deserializer caches the item before unweaving its contents, so they may refer back to it.
+    _supports_cycles: bool = False
 
     @classmethod
     def weave(
@@ -104,6 +124,50 @@ class WeaverBytesDeserializer(WeaverDeserializer[bytes]):
         return ast.literal_eval(item.json["__inner__"])
 
 
+class WeaverListSerializer(WeaverSerializer[list]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["builtins"]), name="list", version=AllVersions()
+    )
+    _include_subclasses = True
+    _supports_cycles = True
+
+    @classmethod
+    def weave(
+            cls,
+            item: List,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        return WovenClass(
+            pointer=id(item),
+            metadata=cls._metadata,
+            artefacts=set(),
+            documentation={},
+            method_source={},
+            json={"__inner__": [weave_fn(i) for i in item]},
+        )
+
+
+class WeaverListDeserializer(WeaverDeserializer[list]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["builtins"]), name="list", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> List:
+        result = []
+        cache[item.pointer] = result
+        result.extend(unweave_fn(i) for i in item.json["__inner__"])
+        return result
+
+
 class WeaverTupleSerializer(WeaverSerializer[tuple]):
     _metadata = ItemMetadataWithVersion(
         module=tuple(["builtins"]), name="tuple", version=AllVersions()
@@ -260,14 +324,460 @@ class WeaverArtefactIDDeserializer(WeaverDeserializer[ArtefactID]):
         return ArtefactID(int(item.json["_id"]))
 
 
+class WeaverNdarraySerializer(WeaverSerializer[np.ndarray]):
+    """Writes the array buffer directly to a raw artefact, keeping the layout in the JSON.
+
+    Object and structured dtypes cannot be described by a dtype string, and are pickled instead.
+    """
+
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["numpy"]), name="ndarray", version=AllVersions()
+    )
+
+    @classmethod
+    def weave(
+            cls,
+            item: np.ndarray,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        if item.dtype.hasobject or item.dtype.names is not None:
+            artefact_id = active_artefact_registry().save_resource(
+                PickleSerializer.to_resource(item)
+            )
+            json = {"pickled": True, "data": artefact_id}
+        else:
+            contiguous = item
+            if not (item.flags.c_contiguous or item.flags.f_contiguous):
+                contiguous = np.ascontiguousarray(item)
+            # Ravelling in memory order is a view for any contiguous array, so the buffer is never copied.
+            buffer = memoryview(contiguous.ravel(order="K").view(np.uint8))
+            artefact_id = active_artefact_registry().save_buffer(buffer, RawSerializer.tag())
+            json = {
+                "pickled": False,
+                "dtype": contiguous.dtype.str,
+                "shape": list(contiguous.shape),
+                "strides": list(contiguous.strides),
+                "data": artefact_id,
+            }
+        return WovenClass(
+            pointer=id(item),
+            metadata=cls._metadata,
+            artefacts={artefact_id},
+            documentation={},
+            method_source={},
+            json=json,
+        )
+
+
+class WeaverNdarrayDeserializer(WeaverDeserializer[np.ndarray]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["numpy"]), name="ndarray", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> np.ndarray:
+        artefact_id = item.json["data"]
+        if item.json["pickled"]:
+            return active_artefact_registry().load_from_id(artefact_id)
+        dtype = np.dtype(item.json["dtype"])
+        shape = tuple(item.json["shape"])
+        if 0 in shape:
+            return np.empty(shape, dtype=dtype)
+        return np.ndarray(
+            shape,
+            dtype=dtype,
+            buffer=active_artefact_registry().load_payload(artefact_id),
+            strides=tuple(item.json["strides"]),
+        )
+
+
+def _save_arrow_table(table: pa.Table) -> ArtefactID:
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    return active_artefact_registry().save_buffer(memoryview(sink.getvalue()), RawSerializer.tag())
+
+
+def _load_arrow_table(artefact_id: ArtefactID) -> pa.Table:
+    # Columns are views over the memory-mapped artefact, and are only read from disk when accessed.
+    buffer = pa.py_buffer(active_artefact_registry().load_payload(artefact_id))
+    return pa.ipc.open_file(buffer).read_all()
+
+
+class WeaverArrowTableSerializer(WeaverSerializer[pa.Table]):
+    """Writes the table as an Arrow IPC (Feather) file, which is memory-mapped again on load."""
+
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["pyarrow", "lib"]), name="Table", version=AllVersions()
+    )
+
+    @classmethod
+    def weave(
+            cls,
+            item: pa.Table,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        artefact_id = _save_arrow_table(item)
+        return WovenClass(
+            pointer=id(item),
+            metadata=cls._metadata,
+            artefacts={artefact_id},
+            documentation={},
+            method_source={},
+            json={"data": artefact_id},
+        )
+
+
+class WeaverArrowTableDeserializer(WeaverDeserializer[pa.Table]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["pyarrow", "lib"]), name="Table", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> pa.Table:
+        return _load_arrow_table(item.json["data"])
+
+
+def _arrow_roundtrips(table: pa.Table) -> bool:
+    """Whether the object columns of a table converted from pandas come back as the same Python objects.
+
+    Arrow infers a type for object columns from their values, e.g. a struct from dicts, which then converts back to
+    different objects, such as dicts with every key of the struct. Only strings and bytes are known to come back
+    unchanged.
+    """
+    for column in table.schema.pandas_metadata["columns"]:
+        if column["numpy_type"] != "object":
+            continue
+        arrow_type = table.schema.field(column["field_name"]).type
+        if not (
+            pa.types.is_string(arrow_type)
+            or pa.types.is_large_string(arrow_type)
+            or pa.types.is_binary(arrow_type)
+            or pa.types.is_large_binary(arrow_type)
+            or pa.types.is_null(arrow_type)
+        ):
+            return False
+    return True
+
+
+class WeaverDataFrameSerializer(WeaverSerializer["pandas.DataFrame"]):
+    """Writes the frame, index included, as an Arrow IPC (Feather) file.
+
+    Frames Arrow cannot represent, such as those with duplicate column names or mixed types within an object
+    column, are pickled instead, as are frames whose object columns Arrow would convert to other values. pandas
+    itself is only needed once a DataFrame is being woven.
+    """
+
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["pandas", "core", "frame"]), name="DataFrame", version=AllVersions()
+    )
+
+    @classmethod
+    def weave(
+            cls,
+            item: "pandas.DataFrame",
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        try:
+            table = pa.Table.from_pandas(item, preserve_index=True)
+        except (pa.ArrowException, ValueError, TypeError):
+            table = None
+        if table is not None and _arrow_roundtrips(table):
+            artefact_id = _save_arrow_table(table)
+            json = {"pickled": False, "data": artefact_id}
+        else:
+            artefact_id = active_artefact_registry().save_resource(
+                PickleSerializer.to_resource(item)
+            )
+            json = {"pickled": True, "data": artefact_id}
+        return WovenClass(
+            pointer=id(item),
+            metadata=cls._metadata,
+            artefacts={artefact_id},
+            documentation={},
+            method_source={},
+            json=json,
+        )
+
+
+class WeaverDataFrameDeserializer(WeaverDeserializer["pandas.DataFrame"]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["pandas", "core", "frame"]), name="DataFrame", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> "pandas.DataFrame":
+        if item.json["pickled"]:
+            return active_artefact_registry().load_from_id(item.json["data"])
+        return _load_arrow_table(item.json["data"]).to_pandas()
+
+
+def _torch_dtype(name: str) -> "torch.dtype":
+    import torch
+
+    dtype = getattr(torch, name, None)
+    if not isinstance(dtype, torch.dtype):
+        raise IncorrectParseError(f"Unknown torch dtype {name}")
+    return dtype
+
+
+def _weave_tensor(
+        item: "torch.Tensor", metadata: ItemMetadataWithVersion, cache: Dict[Any, Any]
+) -> WovenClass:
+    import torch
+
+    if item.device.type != "cpu" or item.layout != torch.strided or item.is_quantized:
+        artefact_id = active_artefact_registry().save_resource(PickleSerializer.to_resource(item))
+        json = {"pickled": True, "data": artefact_id}
+    else:
+        storage = item.untyped_storage()
+        # Tensors sharing a storage, such as tied weights or views, write it once per weave.
+        storage_key = ("torch_storage", storage.data_ptr(), storage.nbytes())
+        if storage_key not in cache:
+            storage_bytes = torch.empty(0, dtype=torch.uint8).set_(storage)
+            artefact_id = active_artefact_registry().save_buffer(
+                memoryview(storage_bytes.numpy()), RawSerializer.tag()
+            )
+            cache[storage_key] = (storage, artefact_id)
+        _, artefact_id = cache[storage_key]
+        json = {
+            "pickled": False,
+            "dtype": str(item.dtype).removeprefix("torch."),
+            "shape": list(item.shape),
+            "strides": list(item.stride()),
+            "storage_offset": item.storage_offset(),
+            "requires_grad": item.requires_grad,
+            # Storage holds the values before any lazy conjugation or negation of this view.
+            "conj": item.is_conj(),
+            "neg": item.is_neg(),
+            # Identifies the storage, rather than its content, so only tensors which shared it share it again.
+            "storage": list(storage_key[1:]),
+            "data": artefact_id,
+        }
+    return WovenClass(
+        pointer=id(item),
+        metadata=metadata,
+        artefacts={artefact_id},
+        documentation={},
+        method_source={},
+        json=json,
+    )
+
+
+def _unweave_tensor(item: WovenClass, cache: Dict[Any, Any]) -> "torch.Tensor":
+    import torch
+
+    artefact_id = item.json["data"]
+    if item.json["pickled"]:
+        return active_artefact_registry().load_from_id(artefact_id)
+    storage_key = ("torch_storage", *item.json["storage"])
+    if storage_key not in cache:
+        payload = active_artefact_registry().load_payload(artefact_id)
+        if payload.nbytes == 0:
+            cache[storage_key] = torch.empty(0, dtype=torch.uint8)
+        else:
+            # The memory-mapped payload is copy-on-write, so the tensor can be written to without touching the file.
+            cache[storage_key] = torch.frombuffer(payload, dtype=torch.uint8)
+    dtype = _torch_dtype(item.json["dtype"])
+    tensor = torch.as_strided(
+        cache[storage_key].view(dtype),
+        item.json["shape"],
+        item.json["strides"],
+        item.json["storage_offset"],
+    )
+    if item.json["neg"]:
+        tensor = torch._neg_view(tensor)
+    if item.json["conj"]:
+        tensor = tensor.conj()
+    return tensor.requires_grad_(item.json["requires_grad"])
+
+
+class WeaverTensorSerializer(WeaverSerializer["torch.Tensor"]):
+    """Writes the tensor's storage directly to a raw artefact, keeping dtype, shape and strides in the JSON.
+
+    Only CPU tensors with a strided layout are written this way; others are pickled. torch itself is only needed
+    once a tensor is being woven.
+    """
+
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["torch"]), name="Tensor", version=AllVersions()
+    )
+
+    @classmethod
+    def weave(
+            cls,
+            item: "torch.Tensor",
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        return _weave_tensor(item, cls._metadata, cache)
+
+
+class WeaverTensorDeserializer(WeaverDeserializer["torch.Tensor"]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["torch"]), name="Tensor", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> "torch.Tensor":
+        return _unweave_tensor(item, cache)
+
+
+class WeaverParameterSerializer(WeaverSerializer["torch.nn.Parameter"]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["torch", "nn", "parameter"]), name="Parameter", version=AllVersions()
+    )
+
+    @classmethod
+    def weave(
+            cls,
+            item: "torch.nn.Parameter",
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            weave_fn: Callable,
+    ) -> WovenClass:
+        return _weave_tensor(item, cls._metadata, cache)
+
+
+class WeaverParameterDeserializer(WeaverDeserializer["torch.nn.Parameter"]):
+    _metadata = ItemMetadataWithVersion(
+        module=tuple(["torch", "nn", "parameter"]), name="Parameter", version=AllVersions()
+    )
+
+    @classmethod
+    def unweave(
+            cls,
+            item: WovenClass,
+            registry: WeaverRegistry,
+            cache: Dict[int, Any],
+            unweave_fn: Callable,
+    ) -> "torch.nn.Parameter":
+        import torch
+
+        tensor = _unweave_tensor(item, cache)
+        if isinstance(tensor, torch.nn.Parameter):
+            return tensor
+        return torch.nn.Parameter(tensor, requires_grad=item.json["requires_grad"])
+
+
+def _upper_key(version_range: VersionRange) -> Tuple[float, ...]:
+    """Orders ranges by their upper bound, so that a range contains version v at or above its lower bound exactly
+    when its key is greater than `(*v, 0)`."""
+    if version_range.upper is None:
+        return (math.inf,)
+    upper = version_range.upper
+    return (upper.major, upper.minor, upper.patch, int(version_range.upper_inclusive))
+
+
+@dataclass
+class VersionIndex(Generic[T]):
+    """Serdes registered for one ItemMetadata, by the versions they support.
+
+    A version resolves to an exact match first, then to the range with the highest lower bound containing it, and
+    then to AllVersions. Ranges are kept sorted by lower bound so the ranges starting at or below a version are found
+    by binary search. Among those, the last whose upper bound is above the version is found through a tree holding
+    the highest upper bound of each span of ranges, so lookups take logarithmic time even when ranges overlap.
+    """
+
+    exact: Dict[Versioning, T] = field(default_factory=dict)
+    ranges: List[Tuple[Tuple[int, ...], VersionRange, T]] = field(default_factory=list)
+    # Highest _upper_key within each node of a binary tree over `ranges`, with the leaves from index `_leaves`.
+    _max_upper: List[Tuple[float, ...]] = field(default_factory=list, repr=False, compare=False)
+    _leaves: int = field(default=1, repr=False, compare=False)
+
+    def add(self, version: Versioning, serde: T) -> None:
+        self.exact[version] = serde
+        if isinstance(version, VersionRange):
+            self.ranges = [r for r in self.ranges if r[1] != version]
+            bisect.insort(self.ranges, (version.sort_key(), version, serde), key=lambda r: r[0])
+            self._build_tree()
+
+    def _build_tree(self) -> None:
+        self._leaves = 1
+        while self._leaves < len(self.ranges):
+            self._leaves *= 2
+        # Empty tuples sort below every key, so padding never matches.
+        self._max_upper = [()] * (2 * self._leaves)
+        for position, (_, version_range, _) in enumerate(self.ranges):
+            self._max_upper[self._leaves + position] = _upper_key(version_range)
+        for node in reversed(range(1, self._leaves)):
+            self._max_upper[node] = max(self._max_upper[2 * node], self._max_upper[2 * node + 1])
+
+    def _last_above(self, node: int, start: int, stop: int, end: int, key: Tuple[int, ...]) -> int:
+        """The last position before `end`, within the node covering [start, stop), whose upper key exceeds `key`."""
+        if start >= end or self._max_upper[node] <= key:
+            return -1
+        if node >= self._leaves:
+            return start
+        middle = (start + stop) // 2
+        position = self._last_above(2 * node + 1, middle, stop, end, key)
+        if position < 0:
+            position = self._last_above(2 * node, start, middle, end, key)
+        return position
+
+    def get(self, version: Versioning) -> Optional[T]:
+        if version in self.exact:
+            return self.exact[version]
+        if isinstance(version, Version) and self.ranges:
+            # Every range before `end` starts at or below the version.
+            end = bisect.bisect_right(
+                self.ranges, VersionRange(lower=version).sort_key(), key=lambda r: r[0]
+            )
+            key = (version.major, version.minor, version.patch, 0)
+            position = self._last_above(1, 0, self._leaves, end, key)
+            if position >= 0:
+                return self.ranges[position][2]
+        return self.exact.get(AllVersions())
+
+    def __contains__(self, version: Versioning) -> bool:
+        return self.get(version) is not None
+
+
 @dataclass
 class WeaverRegistry:
-    _serializer: Dict[ItemMetadata, Dict[Versioning, Type[WeaverSerializer]]] = field(
+    _serializer: Dict[ItemMetadata, VersionIndex[Type[WeaverSerializer]]] = field(
         default_factory=dict
     )
     _deserializer: Dict[
-        ItemMetadata, Dict[Versioning, Type[WeaverDeserializer]]
+        ItemMetadata, VersionIndex[Type[WeaverDeserializer]]
     ] = field(default_factory=dict)
+    # Serializer per type, including the types which have no serializer.
+    _dispatch: Dict[type, Optional[Type[WeaverSerializer]]] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+    # Whether generic objects are woven with their class docstring and method source.
+    capture_documentation: bool = True
 
     @classmethod
     def defaults(cls) -> WeaverRegistry:
@@ -276,6 +786,8 @@ class WeaverRegistry:
             [
                 WeaverBytesSerializer,
                 WeaverBytesDeserializer,
+                WeaverListSerializer,
+                WeaverListDeserializer,
                 WeaverTupleSerializer,
                 WeaverTupleDeserializer,
                 WeaverSetSerializer,
@@ -284,6 +796,16 @@ class WeaverRegistry:
                 WeaverTypeDeserializer,
                 WeaverArtefactIDSerializer,
                 WeaverArtefactIDDeserializer,
+                WeaverNdarraySerializer,
+                WeaverNdarrayDeserializer,
+                WeaverArrowTableSerializer,
+                WeaverArrowTableDeserializer,
+                WeaverDataFrameSerializer,
+                WeaverDataFrameDeserializer,
+                WeaverTensorSerializer,
+                WeaverTensorDeserializer,
+                WeaverParameterSerializer,
+                WeaverParameterDeserializer,
             ]
         )
         return registry
@@ -301,29 +823,52 @@ class WeaverRegistry:
             for s in serializer:
                 self.add_serializer(s)
         elif WeaverSerializer in serializer.__mro__:
-            metadata = serializer.metadata()
-            try:
-                self._serializer[metadata][AllVersions()] = serializer
-            except KeyError:
-                self._serializer[metadata] = {}
-                self._serializer[metadata][AllVersions()] = serializer
+            self._serializer.setdefault(serializer.metadata(), VersionIndex()).add(
+                serializer._metadata.version, serializer
+            )
+            self._dispatch.clear()
         elif WeaverDeserializer in serializer.__mro__:
-            metadata = serializer.metadata()
-            try:
-                self._deserializer[metadata][AllVersions()] = serializer
-            except KeyError:
-                self._deserializer[metadata] = {}
-                self._deserializer[metadata][AllVersions()] = serializer
+            self._deserializer.setdefault(serializer.metadata(), VersionIndex()).add(
+                serializer._metadata.version, serializer
+            )
 
     def try_get_serializer(self, item) -> Optional[Type[WeaverSerializer]]:
-        metadata_with_version = ItemMetadataWithVersion.detect(item)
+        item_type = type(item)
+        try:
+            serializer = self._dispatch[item_type]
+        except KeyError:
+            serializer = self._resolve_serializer(item_type)
+            self._dispatch[item_type] = serializer
+        if serializer is _BY_METADATA:
+            return self._lookup_serializer(ItemMetadataWithVersion.detect(item))
+        return serializer
+
+    def _resolve_serializer(self, item_type: type) -> Optional[Type[WeaverSerializer]]:
+        if issubclass(item_type, type):
+            return _BY_METADATA
+        for position, base in enumerate(item_type.__mro__):
+            # Only bases with a serializer registered under their name have their module imported, for its version.
+            metadata = ItemMetadata(tuple(base.__module__.split(".")), base.__name__)
+            if metadata not in self._serializer:
+                continue
+            try:
+                serializer = self._lookup_serializer(ItemMetadataWithVersion.detect(base))
+            except ImportError:
+                continue
+            if serializer is not None and (position == 0 or serializer._include_subclasses):
+                return serializer
+        return None
+
+    def clear_dispatch(self) -> None:
+        """Forget the serializer chosen for each type, e.g. after ItemMetadataWithVersion.clear_detected."""
+        self._dispatch.clear()
+
+    def _lookup_serializer(
+            self, metadata_with_version: ItemMetadataWithVersion
+    ) -> Optional[Type[WeaverSerializer]]:
         metadata = metadata_with_version.without_version()
         if metadata in self._serializer:
-            serializers = self._serializer[metadata]
-            if metadata_with_version.version in serializers:
-                return serializers[metadata_with_version.version]
-            elif AllVersions() in serializers:
-                return serializers[AllVersions()]
+            return self._serializer[metadata].get(metadata_with_version.version)
 
     def try_get_deserializer(
             self, item: WovenClass
@@ -331,8 +876,4 @@ class WeaverRegistry:
         metadata_with_version = item.metadata
         metadata = metadata_with_version.without_version()
         if metadata in self._deserializer:
-            deserializers = self._deserializer[metadata]
-            if metadata_with_version.version in deserializers:
-                return deserializers[metadata_with_version.version]
-            elif AllVersions() in deserializers:
-                return deserializers[AllVersions()]
+            return self._deserializer[metadata].get(metadata_with_version.version)
@@ -1,33 +1,83 @@
 from __future__ import annotations
 
-__all__ = ["Resource"]
+__all__ = ["Resource", "register_hash_algorithm", "DEFAULT_HASH_ALGORITHM"]
 
 import hashlib
 import pathlib
 import tempfile
 from io import BytesIO
-from typing import Optional, SupportsBytes, Union
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional, SupportsBytes, Union
 
 from artefact_link import PyArtefact
 
+# Artefacts written before the hash algorithm was recorded in the header were hashed with SHA3.
+_LEGACY_HASH_ALGORITHM = "sha3_256"
+_HASH_CHUNK_BYTES = 1 << 24
+
+_HASH_ALGORITHMS: Dict[str, Callable[[], Any]] = {
+    "sha3_256": hashlib.sha3_256,
+    "sha256": hashlib.sha256,
+    "blake2b": lambda: hashlib.blake2b(digest_size=32),
+}
+
+try:
+    import blake3
+
+    _HASH_ALGORITHMS["blake3"] = blake3.blake3
+except ImportError:
+    pass
+
+DEFAULT_HASH_ALGORITHM = "blake2b"
+
+
+def register_hash_algorithm(name: str, factory: Callable[[], Any]) -> None:
+    """Make a hash algorithm available to Resources. `factory` returns a hashlib-style object with `update`
+    and `digest`."""
+    _HASH_ALGORITHMS[name] = factory
+
 
 class Resource:
-    inner: bytes
+    """A payload and the tag naming the serializer it was written with.
+
+    Written to disk as a fixed size header followed by the payload. The header holds the tag, the hash algorithm
+    that the artefact ID is computed with, and the codec of compressed artefacts, each terminated by a null byte.
+    """
+
+    header: bytes
+    payload: Union[bytes, bytearray, memoryview]
+    hash_algorithm: str
     inner_hash: Optional[int]
 
-    def __init__(self, bytes_like: Union[bytes, SupportsBytes, BytesIO], tag: str):
+    def __init__(
+        self,
+        bytes_like: Union[bytes, bytearray, memoryview, SupportsBytes, BytesIO],
+        tag: str,
+        hash_algorithm: Optional[str] = None,
+    ):
         if isinstance(bytes_like, SupportsBytes):
-            self.inner = self.write_tag(tag) + bytes_like.__bytes__()
+            self.payload = bytes_like.__bytes__()
         elif isinstance(bytes_like, BytesIO):
-            bytes_like.seek(0)
-            self.inner = self.write_tag(tag) + bytes_like.getvalue()
+            self.payload = bytes_like.getvalue()
         else:
-            self.inner = self.write_tag(tag) + bytes_like
+            # Buffers are kept as-is so that memory-mapped artefacts are never copied.
+            self.payload = bytes_like
+        if hash_algorithm is None:
+            hash_algorithm = DEFAULT_HASH_ALGORITHM
+        if hash_algorithm not in _HASH_ALGORITHMS:
+            raise RuntimeError(f"Unknown hash algorithm {hash_algorithm}")
+        self.hash_algorithm = hash_algorithm
+        self.header = self.write_tag(tag, hash_algorithm)
         self.inner_hash = None
 
     @staticmethod
-    def write_tag(tag: str) -> bytes:
+    def write_tag(
+        tag: str, hash_algorithm: Optional[str] = None, codec: Optional[str] = None
+    ) -> bytes:
         encoded_tag = tag.encode("utf-8")
+        if hash_algorithm is not None:
+            encoded_tag += b"\0" + hash_algorithm.encode("utf-8")
+        if codec is not None:
+            encoded_tag += b"\0" + codec.encode("utf-8")
         padding_bytes = Resource.tag_length_bytes() - len(encoded_tag)
         if padding_bytes > 0:
             return encoded_tag + b"\0" * padding_bytes
@@ -38,7 +88,22 @@ class Resource:
 
     @staticmethod
     def read_tag(tag_bytes: bytes) -> str:
-        return tag_bytes.rstrip(b"\0").decode("utf-8")
+        return bytes(tag_bytes).split(b"\0", 1)[0].decode("utf-8")
+
+    @staticmethod
+    def read_hash_algorithm(tag_bytes: bytes) -> str:
+        fields = bytes(tag_bytes).rstrip(b"\0").split(b"\0")
+        if len(fields) < 2:
+            return _LEGACY_HASH_ALGORITHM
+        return fields[1].decode("utf-8")
+
+    @staticmethod
+    def read_codec(tag_bytes: bytes) -> Optional[str]:
+        """The codec an artefact was compressed with, or None if it is stored uncompressed."""
+        fields = bytes(tag_bytes).rstrip(b"\0").split(b"\0")
+        if len(fields) < 3:
+            return None
+        return fields[2].decode("utf-8")
 
     @staticmethod
     def tag_length_chars() -> int:
@@ -57,30 +122,61 @@ class Resource:
         return 512
 
     def tag(self) -> str:
-        return self.read_tag(self.inner[: self.tag_length_bytes()])
+        return self.read_tag(self.header)
+
+    @property
+    def inner(self) -> bytes:
+        """Tag followed by the payload, as written to disk. Copies the payload."""
+        return self.header + self.payload
+
+    def buffer(self) -> memoryview:
+        """The payload without the tag, without copying it."""
+        return memoryview(self.payload)
+
+    def write(self, f: BinaryIO) -> None:
+        f.write(self.header)
+        f.write(self.payload)
 
     def __bytes__(self) -> bytes:
-        return self.inner[self.tag_length_bytes() :]
+        return bytes(self.payload)
 
     def __hash__(self) -> int:
-        """Not the same as the Artefact ID, which is calculated internally."""
+        return hash(self.digest())
+
+    def digest(self) -> int:
+        """Full digest of the header and payload, as written to disk, which the ArtefactID is taken from."""
         if self.inner_hash is None:
-            self.inner_hash = int(hashlib.sha3_256(self.inner).hexdigest(), base=16)
+            self.inner_hash = Resource.hash_chunks(
+                [self.header, self.payload], self.hash_algorithm
+            )
         return self.inner_hash
 
-    # TODO: From Artefact is the moment where the Artefact is downloaded and saved
-    #   and therefore should be performed async.
+    @staticmethod
+    def hash_chunks(
+        chunks: Iterable[Union[bytes, bytearray, memoryview]], hash_algorithm: str
+    ) -> int:
+        """Hash consecutive chunks of an artefact, feeding large buffers to the digest in slices without copying."""
+        digest = _HASH_ALGORITHMS[hash_algorithm]()
+        for chunk in chunks:
+            chunk = memoryview(chunk).cast("B")
+            for start in range(0, len(chunk), _HASH_CHUNK_BYTES):
+                digest.update(chunk[start : start + _HASH_CHUNK_BYTES])
+        return int.from_bytes(digest.digest(), "big")
+
+    # Downloads many artefacts concurrently, straight into the artefact store, see weaver.artefact_fetcher.
     @staticmethod
     def from_artefact(artefact: PyArtefact) -> Resource:
         with tempfile.TemporaryDirectory() as t:
-            data = bytearray(open(artefact.path(pathlib.Path(t)), "rb").read())
-            tag = data[: Resource.tag_length_bytes()]
-            del data[: Resource.tag_length_bytes()]
-            return Resource(data, Resource.read_tag(tag))
+            with open(artefact.path(pathlib.Path(t)), "rb") as f:
+                return Resource.from_weaver_artefact(f.read())
 
     @staticmethod
-    def from_weaver_artefact(data: bytes) -> Resource:
-        data = bytearray(data)
-        tag = data[: Resource.tag_length_bytes()]
-        del data[: Resource.tag_length_bytes()]
-        return Resource(data, Resource.read_tag(tag))
+    def from_weaver_artefact(data: Union[bytes, memoryview]) -> Resource:
+        """Split an artefact into tag and payload, slicing rather than copying the payload."""
+        data = memoryview(data)
+        tag = bytes(data[: Resource.tag_length_bytes()])
+        return Resource(
+            data[Resource.tag_length_bytes() :],
+            Resource.read_tag(tag),
+            Resource.read_hash_algorithm(tag),
+        )
@@ -1,9 +1,9 @@
-__all__ = ["Serializable"]
+__all__ = ["Serializable", "PickleSerializer", "RawSerializer"]
 
 import pathlib
 import pickle
 from abc import abstractmethod
-from typing import Generic, Optional, TypeVar, Type
+from typing import Generic, Optional, TypeVar, Type, Union
 
 import weaver
 from weaver.resource import Resource
@@ -31,7 +31,7 @@ class Serializable(Generic[T]):
     @classmethod
     def to_file(cls, item: T, filename: pathlib.Path) -> pathlib.Path:
         with open(filename, "wb") as f:
-            f.write(cls.to_resource(item).inner)
+            cls.to_resource(item).write(f)
         return filename
 
     @staticmethod
@@ -54,10 +54,28 @@ class PickleSerializer(Serializable[T]):
 
     @staticmethod
     def from_resource(uninitialised_item: Optional[T], buffer: Resource) -> T:
-        return pickle.loads(buffer.__bytes__())
+        return pickle.loads(buffer.buffer())
+
+
+class RawSerializer(Serializable[memoryview]):
+    """Stores a contiguous buffer as-is, leaving the layout to be described elsewhere."""
+
+    @staticmethod
+    def tag() -> str:
+        return f"raw;{Serializable.version()}"
+
+    @staticmethod
+    def to_resource(item: Union[bytes, memoryview]) -> Resource:
+        return Resource(item, RawSerializer.tag())
+
+    @staticmethod
+    def from_resource(
+        uninitialised_item: Optional[memoryview], buffer: Resource
+    ) -> memoryview:
+        return buffer.buffer()
 
 
 def serializer_factory(tag: str) -> Optional[Type[Serializable]]:
-    for serializer in [PickleSerializer]:
+    for serializer in [PickleSerializer, RawSerializer]:
         if serializer.tag() == tag:
             return serializer
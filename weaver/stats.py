@@ -0,0 +1,153 @@
+"""
+Opt-in counters and timings for weave and unweave.
+
+Collection is switched on by a WeaveStats being active, either as a context manager or passed to `weave`/`unweave`.
+While none is active, each instrumented point costs a single ContextVar lookup.
+"""
+
+from __future__ import annotations
+
+__all__ = ["WeaveStats", "active_stats", "timed"]
+
+import heapq
+import itertools
+import threading
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class WeaveStats:
+    """Counts, phase times and artefact sizes collected while active as a context manager.
+
+    Times per object are self times, excluding the objects nested within them, so the slowest objects are the ones
+    which are themselves expensive rather than the roots of large trees. Phases, such as `getsource` or `save`,
+    overlap with object times and with each other when nested: `save` covers the `pickle`, `hash` and `write` of an
+    artefact, and only its submission when an ArtefactWriter hashes and writes it on another thread. The bytes
+    written for each artefact, zero when its content was already present, are recorded by its ID.
+
+    May be entered again while already active, e.g. by `weave(stats=...)` within its own `with` block.
+    """
+
+    def __init__(self, slowest: int = 10) -> None:
+        self.type_counts: Counter = Counter()
+        self.phase_seconds: Dict[str, float] = defaultdict(float)
+        self.phase_counts: Counter = Counter()
+        self.artefact_count = 0
+        self.artefact_bytes = 0
+        self.artefact_bytes_by_type: Counter = Counter()
+        self.artefact_bytes_written: Dict[int, int] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.slowest_count = slowest
+        self._slowest: List[Tuple[float, int, str, int]] = []
+        self._order = itertools.count()
+        # Start time, time spent in nested objects, and type name, of each object being processed.
+        self._stack: List[List[Any]] = []
+        # Context token and object depth of each entry, innermost last.
+        self._entries: List[Tuple[Any, int]] = []
+        # Phases and artefact writes are also recorded from ArtefactWriter threads.
+        self._lock = threading.Lock()
+
+    def object_started(self, type_name: str) -> None:
+        self.cache_misses += 1
+        self._stack.append([perf_counter(), 0.0, type_name])
+
+    def object_finished(self, pointer: int) -> None:
+        start, nested_seconds, type_name = self._stack.pop()
+        seconds = perf_counter() - start
+        if self._stack:
+            self._stack[-1][1] += seconds
+        self.type_counts[type_name] += 1
+        entry = (seconds - nested_seconds, next(self._order), type_name, pointer)
+        if len(self._slowest) < self.slowest_count:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest:
+            heapq.heappushpop(self._slowest, entry)
+
+    def cache_hit(self) -> None:
+        self.cache_hits += 1
+
+    def add_phase(self, phase: str, seconds: float) -> None:
+        with self._lock:
+            self.phase_seconds[phase] += seconds
+            self.phase_counts[phase] += 1
+
+    def artefact_written(self, artefact_id: int, size: int) -> None:
+        """Record the bytes written to disk for an artefact."""
+        with self._lock:
+            self.artefact_bytes_written[artefact_id] = (
+                self.artefact_bytes_written.get(artefact_id, 0) + size
+            )
+
+    def artefact_saved(self, size: int) -> None:
+        """Record an artefact of `size` bytes, against the type of the object being processed."""
+        self.artefact_count += 1
+        self.artefact_bytes += size
+        self.artefact_bytes_by_type[self._stack[-1][2] if self._stack else None] += size
+
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+    def slowest(self) -> List[Tuple[float, str, int]]:
+        """The slowest objects as (self seconds, type name, pointer), slowest first."""
+        return [
+            (seconds, type_name, pointer)
+            for (seconds, _, type_name, pointer) in sorted(self._slowest, reverse=True)
+        ]
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "type_counts": dict(self.type_counts),
+            "phase_seconds": dict(self.phase_seconds),
+            "phase_counts": dict(self.phase_counts),
+            "artefact_count": self.artefact_count,
+            "artefact_bytes": self.artefact_bytes,
+            "artefact_bytes_by_type": {
+                str(key): value for (key, value) in self.artefact_bytes_by_type.items()
+            },
+            "artefact_bytes_written": {
+                str(key): value for (key, value) in self.artefact_bytes_written.items()
+            },
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hit_rate(),
+            "slowest": [
+                {"seconds": seconds, "type": type_name, "pointer": pointer}
+                for (seconds, type_name, pointer) in self.slowest()
+            ],
+        }
+
+    def __enter__(self) -> WeaveStats:
+        self._entries.append((_ACTIVE_STATS.set(self), len(self._stack)))
+        return self
+
+    def __exit__(self, *args) -> None:
+        token, depth = self._entries.pop()
+        _ACTIVE_STATS.reset(token)
+        # Objects left open within this block by an exception are discarded.
+        del self._stack[depth:]
+
+
+_ACTIVE_STATS: ContextVar[Optional[WeaveStats]] = ContextVar(
+    "weaver_stats", default=None
+)
+
+# The WeaveStats active in this context, or None.
+active_stats = _ACTIVE_STATS.get
+
+
+def timed(phase: str, fn: Callable[..., T], *args: Any) -> T:
+    """Call `fn`, adding its duration to `phase` of the active WeaveStats, if any."""
+    stats = _ACTIVE_STATS.get()
+    if stats is None:
+        return fn(*args)
+    start = perf_counter()
+    try:
+        return fn(*args)
+    finally:
+        stats.add_phase(phase, perf_counter() - start)
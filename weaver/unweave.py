@@ -1,9 +1,26 @@
+from contextlib import nullcontext
 from functools import partial
-from typing import Any, Tuple, Union, Dict, List, Set, Optional
+from typing import Any, Callable, Tuple, Union, Dict, List, Set, Optional
 
-from weaver.artefact_registry import ArtefactRegistry
-from weaver.data import WovenClass, ArtefactID, SerializeableType
+from weaver.artefact_registry import ArtefactRegistry, ArtefactPrefetcher, active_artefact_registry
+from weaver.data import (
+    ItemMetadata,
+    WovenClass,
+    ArtefactID,
+    SerializeableType,
+    CacheMarker,
+    IncorrectParseError,
+    iter_artefacts,
+)
+from weaver.lazy import LazyArtefact
 from weaver.registry import WeaverRegistry
+from weaver.stats import WeaveStats, active_stats, timed
+
+
+StateRestorer = Callable[[Any, Dict[str, Any]], Any]
+
+# Class and StateRestorer for each ItemMetadata's module and name, shared across unweaves.
+_RESOLVED_CLASSES: Dict[Tuple[Tuple[str], str], Tuple[Any, StateRestorer]] = {}
 
 
 def identify_class(module: Tuple[str], module_name: str) -> Any:
@@ -14,50 +31,151 @@ def identify_class(module: Tuple[str], module_name: str) -> Any:
 
 
 def default_unweave(base_class: Any, state: Dict[str, Any]) -> Any:
-    base_class = base_class.__new__(base_class)
+    return restore_state(base_class.__new__(base_class), state)
+
+
+def _update_dict(instance: Any, state: Dict[str, Any]) -> Any:
+    instance.update(state)
+    return instance
+
+
+def _set_state(instance: Any, state: Dict[str, Any]) -> Any:
+    instance.__setstate__(state)
+    return instance
+
+
+def _init_attrs(instance: Any, state: Dict[str, Any]) -> Any:
+    instance.__init__(**state)
+    return instance
+
+
+def _update_instance_dict(instance: Any, state: Dict[str, Any]) -> Any:
+    instance.__dict__.update(state)
+    return instance
+
+
+def state_restorer(base_class: Any) -> StateRestorer:
+    """The strategy `restore_state` would choose for instances of `base_class`, chosen once for the class."""
+    if hasattr(base_class, "__getattr__"):
+        # Instances may answer for attributes their class lacks, so the choice must be made per instance.
+        return restore_state
+    if isinstance(base_class, type) and issubclass(base_class, dict):
+        return _update_dict
     if hasattr(base_class, "__setstate__"):
-        base_class.__setstate__(state)
+        return _set_state
+    if hasattr(base_class, "__attrs_attrs__"):
+        return _init_attrs
+    return _update_instance_dict
+
+
+def resolve_class(metadata: ItemMetadata) -> Tuple[Any, StateRestorer]:
+    """The class for `metadata`, and its StateRestorer, imported on first use and then cached."""
+    key = (metadata.module, metadata.name)
+    try:
+        return _RESOLVED_CLASSES[key]
+    except KeyError:
+        pass
+    base_class = timed("identify_class", identify_class, metadata.module, metadata.name)
+    resolved = (base_class, state_restorer(base_class))
+    _RESOLVED_CLASSES[key] = resolved
+    return resolved
+
+
+def clear_resolved_classes() -> None:
+    """Forget the classes resolved by earlier unweaves, e.g. after their modules have been reloaded."""
+    _RESOLVED_CLASSES.clear()
+
+
+def restore_state(instance: Any, state: Dict[str, Any]) -> Any:
+    if isinstance(instance, dict):
+        instance.update(state)
+    elif hasattr(instance, "__setstate__"):
+        instance.__setstate__(state)
     else:
-        if hasattr(base_class, "__attrs_attrs__"):
-            base_class.__init__(**state)
+        if hasattr(instance, "__attrs_attrs__"):
+            instance.__init__(**state)
         else:
-            base_class.__dict__.update(state)
-    return base_class
+            instance.__dict__.update(state)
+    return instance
 
 
 def _unweave(
-    nest: Union[WovenClass, ArtefactID, SerializeableType],
+    nest: Union[WovenClass, ArtefactID, CacheMarker, SerializeableType],
     registry: WeaverRegistry,
     cache: Dict[int, Any],
+    lazy: bool = False,
 ) -> Any:
     if nest is None:
         return None
     if isinstance(nest, list):
-        return [_unweave(item, registry, cache) for item in nest]
+        return [_unweave(item, registry, cache, lazy) for item in nest]
     if isinstance(nest, set):
-        return {_unweave(item, registry, cache) for item in nest}
+        return {_unweave(item, registry, cache, lazy) for item in nest}
     if isinstance(nest, Dict):
-        return {key: _unweave(value, registry, cache) for (key, value) in nest.items()}
+        return {key: _unweave(value, registry, cache, lazy) for (key, value) in nest.items()}
     if isinstance(nest, SerializeableType):
         return nest
     if isinstance(nest, ArtefactID):
-        return ArtefactRegistry().load_from_id(nest)
+        if lazy:
+            return LazyArtefact(nest, active_artefact_registry())
+        return timed("load", active_artefact_registry().load_from_id, nest)
+    stats = active_stats()
+    if isinstance(nest, CacheMarker):
+        if nest.pointer not in cache:
+            raise IncorrectParseError(
+                f"CacheMarker {nest.pointer} refers to an item that has not been unwoven"
+            )
+        if stats is not None:
+            stats.cache_hit()
+        return cache[nest.pointer]
     if nest.pointer in cache:
+        if stats is not None:
+            stats.cache_hit()
         return cache[nest.pointer]
+    if stats is not None:
+        stats.object_started(".".join([*nest.metadata.module, nest.metadata.name]))
     if (deserializer := registry.try_get_deserializer(nest)) is not None:
-        return deserializer.unweave(
-            nest, registry, cache, partial(_unweave, registry=registry, cache=cache)
+        cache[nest.pointer] = deserializer.unweave(
+            nest,
+            registry,
+            cache,
+            partial(_unweave, registry=registry, cache=cache, lazy=lazy),
         )
-    state = {key: _unweave(value, registry, cache) for (key, value) in nest.json.items()}
-    base_class = identify_class(nest.metadata.module, nest.metadata.name)
-    return default_unweave(base_class, state)
+        item = cache[nest.pointer]
+    else:
+        base_class, restorer = resolve_class(nest.metadata)
+        # Register the instance before its state is unwoven so cyclic references resolve to it.
+        instance = base_class.__new__(base_class)
+        cache[nest.pointer] = instance
+        state = {key: _unweave(value, registry, cache, lazy) for (key, value) in nest.json.items()}
+        item = timed("restore_state", restorer, instance, state)
+    if stats is not None:
+        stats.object_finished(nest.pointer)
+    return item
 
 
 def unweave(
     nest: Union[WovenClass, ArtefactID, List, Set],
     registry: Optional[WeaverRegistry] = None,
+    lazy: bool = False,
+    workers: Optional[int] = None,
+    stats: Optional[WeaveStats] = None,
+    artefact_registry: Optional[ArtefactRegistry] = None,
 ) -> Any:
+    """Rebuild an item from its woven form.
+
+    Artefacts are read from `artefact_registry`, or otherwise from the active ArtefactRegistry. With `lazy`, artefacts are returned as LazyArtefact proxies and only read from disk when first used. Otherwise,
+    with `workers`, the artefacts are read ahead of their use on a pool of that many threads. With `stats`, counts
+    and timings are collected into it, as they are within any active WeaveStats.
+    """
     if registry is None:
         registry = WeaverRegistry.defaults()
     cache = {}
-    return _unweave(nest, registry, cache)
+    with stats if stats is not None else nullcontext(), (
+        artefact_registry if artefact_registry is not None else nullcontext()
+    ):
+        if workers is None or lazy:
+            return _unweave(nest, registry, cache, lazy)
+        artefacts = iter_artefacts(nest, documentation=False)
+        with ArtefactPrefetcher(active_artefact_registry(), artefacts, workers):
+            return _unweave(nest, registry, cache, lazy)
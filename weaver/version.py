@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Union
+from typing import Optional, Tuple, Union
 
 
 @dataclass(unsafe_hash=True)
@@ -53,4 +53,61 @@ class Version:
         return Version(int(major), int(minor), int(patch))
 
 
-Versioning = Union[Version, AllVersions, UnknownVersion]
+@dataclass(unsafe_hash=True)
+class VersionRange:
+    """Versions between two optional bounds, written as e.g. `>=1.2,<1.4`."""
+
+    lower: Optional[Version] = None
+    lower_inclusive: bool = True
+    upper: Optional[Version] = None
+    upper_inclusive: bool = False
+
+    def __str__(self) -> str:
+        clauses = []
+        if self.lower is not None:
+            clauses.append(f"{'>=' if self.lower_inclusive else '>'}{self.lower}")
+        if self.upper is not None:
+            clauses.append(f"{'<=' if self.upper_inclusive else '<'}{self.upper}")
+        return ",".join(clauses)
+
+    def __contains__(self, version: Version) -> bool:
+        if self.lower is not None:
+            if version < self.lower or (version == self.lower and not self.lower_inclusive):
+                return False
+        if self.upper is not None:
+            if version > self.upper or (version == self.upper and not self.upper_inclusive):
+                return False
+        return True
+
+    def sort_key(self) -> Tuple[int, ...]:
+        """Orders ranges by their lower bound, with unbounded ranges first."""
+        if self.lower is None:
+            return (0,)
+        return (1, self.lower.major, self.lower.minor, self.lower.patch, int(not self.lower_inclusive))
+
+    @staticmethod
+    def is_range(item: str) -> bool:
+        return any(operator in item for operator in ("<", ">", "=", ","))
+
+    @staticmethod
+    def from_str(item: str) -> VersionRange:
+        version_range = VersionRange()
+        for clause in item.replace(" ", "").split(","):
+            if clause.startswith("=="):
+                version = Version.from_str(clause[2:])
+                version_range.lower, version_range.lower_inclusive = version, True
+                version_range.upper, version_range.upper_inclusive = version, True
+            elif clause.startswith(">="):
+                version_range.lower, version_range.lower_inclusive = Version.from_str(clause[2:]), True
+            elif clause.startswith(">"):
+                version_range.lower, version_range.lower_inclusive = Version.from_str(clause[1:]), False
+            elif clause.startswith("<="):
+                version_range.upper, version_range.upper_inclusive = Version.from_str(clause[2:]), True
+            elif clause.startswith("<"):
+                version_range.upper, version_range.upper_inclusive = Version.from_str(clause[1:]), False
+            else:
+                raise ValueError(f"Unrecognised version constraint {clause!r}")
+        return version_range
+
+
+Versioning = Union[Version, AllVersions, UnknownVersion, VersionRange]
@@ -1,14 +1,17 @@
+import dataclasses
 import inspect
 import types
+import weakref
+from contextlib import nullcontext
 from typing import (
     Any,
     Dict,
     Union,
     Optional,
-    List, Callable,
+    List, Callable, Tuple, Set,
 )
 
-from weaver.artefact_registry import ArtefactRegistry
+from weaver.artefact_registry import ArtefactRegistry, ArtefactWriter, active_artefact_registry
 from weaver.data import (
     WovenClass,
     ItemMetadataWithVersion,
@@ -18,61 +21,164 @@ from weaver.data import (
 )
 from weaver.registry import WeaverRegistry
 from weaver.serializer import PickleSerializer
+from weaver.stats import WeaveStats, active_stats, timed
 
 from functools import partial
 
+# Docstring and method source of each class, taken from its first instance, for instances using the class docstring.
+_CLASS_DOCUMENTATION: "weakref.WeakKeyDictionary[type, Tuple[Any, Dict[str, str]]]" = (
+    weakref.WeakKeyDictionary()
+)
+_NO_DOCUMENTATION: Any = object()
+# Woven value recorded for an item while a registered serializer is still weaving it.
+_SERIALIZING = object()
+
 
 def weave(
-        item: Any, registry: Optional[WeaverRegistry] = None
+        item: Any,
+        registry: Optional[WeaverRegistry] = None,
+        workers: Optional[int] = None,
+        stats: Optional[WeaveStats] = None,
+        documentation: Optional[bool] = None,
+        artefact_registry: Optional[ArtefactRegistry] = None,
 ) -> Union[WovenClass, ArtefactID, List]:
+    """Convert an item into its woven form, writing large or opaque values as artefacts.
+
+    Artefacts are written to `artefact_registry`, or otherwise to the active ArtefactRegistry. With `workers`,
+    artefacts are hashed and written on a pool of that many threads while the item is walked. With `stats`, counts
+    and timings are collected into it, as they are within any active WeaveStats.
+
+    Docstrings and method source are written for the first instance of each type, unless `documentation` is False
+    or, when it is not given, the registry's `capture_documentation` is False.
+
+    Shared references, including to lists, are woven once. Reference cycles are supported, except those which pass
+    back into an item woven by a registered serializer other than that for lists, such as a tuple holding an object
+    which refers to the tuple. These raise a RuntimeError.
+    """
     if registry is None:
         registry = WeaverRegistry.defaults()
-    res = _weave(item, registry, None)
+    if documentation is not None and documentation != registry.capture_documentation:
+        registry = dataclasses.replace(registry, capture_documentation=documentation)
+    with stats if stats is not None else nullcontext(), (
+        artefact_registry if artefact_registry is not None else nullcontext()
+    ):
+        if workers is None:
+            res = _weave(item, registry, None, None)
+        else:
+            with ArtefactWriter(active_artefact_registry(), workers):
+                res = _weave(item, registry, None, None)
+            _rehash_artefacts(res)
     # Top level return will always be a WovenClass or an ArtefactID
     assert isinstance(res, (WovenClass, ArtefactID, list))
     return res
 
 
-def _weave_fn(
-        item: Callable, registry: WeaverRegistry, cache: Dict[int, Any] = None
-) -> Union[WovenClass, CacheMarker, ArtefactID, SerializeableType, None]:
+def _rehash_artefacts(item: Any) -> None:
+    """Rebuild the artefact sets of a woven tree, whose PendingArtefactIDs have changed hash since being added."""
+    stack = [item]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, WovenClass):
+            # Copying a set directly would reuse the stale hashes, so go through a list.
+            item.artefacts = set(list(item.artefacts))
+            stack.extend(item.json.values())
+        elif isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set)):
+            stack.extend(item)
+
+
+def _method_source(item: Callable) -> Optional[str]:
     try:
-        fn_source = inspect.getsource(item)
-        if fn_source is None:
-            raise ValueError
-        # Weave the fn_source string
-        return _weave(fn_source, registry, cache)
+        return timed("getsource", inspect.getsource, item)
     except (OSError, ValueError, TypeError):
         return None
 
 
+def _documentation_owner(item: Any) -> Any:
+    """The item's class if the item uses the class docstring, otherwise the item, such as a property or module."""
+    item_type = type(item)
+    if getattr(item, "__doc__", _NO_DOCUMENTATION) is getattr(item_type, "__doc__", _NO_DOCUMENTATION):
+        return item_type
+    return item
+
+
+def class_documentation(item: Any) -> Tuple[Any, Dict[str, str]]:
+    """The docstring, and the source of each method, of an item, read once per class for instances using the class
+    docstring."""
+    item_type = type(item)
+    owner = _documentation_owner(item)
+    if owner is item_type:
+        try:
+            return _CLASS_DOCUMENTATION[item_type]
+        except KeyError:
+            pass
+    methods = timed("getmembers", getmembers, item, inspect.ismethod)
+    method_source = {}
+    for (method_name, method) in methods:
+        source = _method_source(method)
+        if source is not None:
+            method_source[method_name] = source
+    documentation = (getattr(item, "__doc__", _NO_DOCUMENTATION), method_source)
+    if owner is item_type:
+        _CLASS_DOCUMENTATION[item_type] = documentation
+    return documentation
+
+
+def clear_class_documentation() -> None:
+    """Forget the documentation read for each class, e.g. after their source files have changed."""
+    _CLASS_DOCUMENTATION.clear()
+
+
 def _weave(
-        item: Any, registry: WeaverRegistry, cache: Dict[int, Any] = None
+        item: Any, registry: WeaverRegistry, cache: Dict[int, Any] = None, documented: Set[Any] = None
 ) -> Union[WovenClass, CacheMarker, ArtefactID, SerializeableType, None]:
     if item is None:
         return None
     if cache is None:
         cache = {}
+    if documented is None:
+        # Classes, or items with their own docstring, whose documentation this weave has already written.
+        documented = set()
     item_id = id(item)
-    if isinstance(item, List):
-        return [_weave(i, registry, cache) for i in item]
-    if isinstance(item, SerializeableType):
+    # Lists are woven by their serializer, so they are shared and may refer to themselves like other containers.
+    if isinstance(item, SerializeableType) and not isinstance(item, list):
         return item
+    stats = active_stats()
     if item_id in cache:
+        if stats is not None:
+            stats.cache_hit()
+        _, woven = cache[item_id]
+        if woven is _SERIALIZING:
+            # Unweave only caches the result of a deserializer once it returns, so it cannot resolve the marker.
+            raise RuntimeError(
+                f"Cannot weave a reference cycle through {type(item).__qualname__}, which has a registered serializer"
+            )
+        # Artefacts are already content addressed, so point at the same blob rather than the first node.
+        if isinstance(woven, ArtefactID):
+            return woven
         return CacheMarker(item_id)
+    # Hold a reference to the item until the weave finishes, so its id cannot be reused by another object.
+    cache[item_id] = (item, None)
+    if stats is not None:
+        stats.object_started(f"{type(item).__module__}.{type(item).__qualname__}")
     if (serializer := registry.try_get_serializer(item)) is not None:
-        return serializer.weave(
-            item, registry, cache, partial(_weave, registry=registry, cache=cache)
+        if not serializer._supports_cycles:
+            cache[item_id] = (item, _SERIALIZING)
+        woven = serializer.weave(
+            item, registry, cache, partial(_weave, registry=registry, cache=cache, documented=documented)
         )
-    return generic_write(cache, registry, item)
+    else:
+        woven = generic_write(cache, registry, item, documented)
+    cache[item_id] = (item, woven)
+    if stats is not None:
+        stats.object_finished(item_id)
+    return woven
 
 
 def write_as_artefact(item: Any) -> ArtefactID:
-    resource = PickleSerializer.to_resource(item)
-    ArtefactRegistry().save_using_id(
-        artefact_id=ArtefactID(hash(resource)), item=resource.inner
-    )
-    return ArtefactID(hash(resource))
+    resource = timed("pickle", PickleSerializer.to_resource, item)
+    return active_artefact_registry().save_resource(resource)
 
 
 def getmembers(object, predicate=None):
@@ -121,7 +227,7 @@ def getmembers(object, predicate=None):
 
 
 def generic_write(
-        cache: Dict[int, Any], registry: WeaverRegistry, item: Any
+        cache: Dict[int, Any], registry: WeaverRegistry, item: Any, documented: Optional[Set[Any]] = None
 ) -> Union[WovenClass, ArtefactID]:
     if hasattr(item, "__pyx_vtable__"):
         return write_as_artefact(item)
@@ -136,20 +242,27 @@ def generic_write(
         state = item.__getstate__()
     else:
         state = item.__dict__
-    metadata = ItemMetadataWithVersion.detect(item)
+    metadata = timed("detect", ItemMetadataWithVersion.detect, item)
     artefacts = set()
-    if hasattr(item, "__doc__"):
-        documentation_artefact = write_as_artefact(getattr(item, "__doc__"))
-        documentation = {metadata: documentation_artefact}
-        artefacts = artefacts | {documentation_artefact}
-    else:
-        documentation = {}
-    method_documentation = {key: _weave_fn(value, registry, cache) for (key, value) in getmembers(item, inspect.ismethod)}
+    documentation = {}
+    method_source = {}
+    if documented is None:
+        documented = set()
+    # Items with their own docstring are held by the cache, so their ids are not reused within the weave.
+    owner = _documentation_owner(item)
+    owner_key = owner if owner is type(item) else id(item)
+    if registry.capture_documentation and owner_key not in documented:
+        documented.add(owner_key)
+        docstring, method_source = class_documentation(item)
+        if docstring is not _NO_DOCUMENTATION:
+            documentation_artefact = write_as_artefact(docstring)
+            documentation = {metadata: documentation_artefact}
+            artefacts = {documentation_artefact}
     return WovenClass(
         pointer=id(item),
-        metadata=ItemMetadataWithVersion.detect(item),
+        metadata=metadata,
         artefacts=artefacts,
         documentation=documentation,
-        method_source={method_name: fn_source for (method_name, fn_source) in method_documentation.items() if fn_source is not None},
-        json={key: _weave(value, registry, cache) for (key, value) in state.items()}
+        method_source=dict(method_source),
+        json={key: _weave(value, registry, cache, documented) for (key, value) in state.items()}
     )
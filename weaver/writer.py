@@ -0,0 +1,144 @@
+"""
+Streaming JSON output for woven items.
+
+Produces the same document as `json.dump(item.as_dict(), fp)`, but walks the WovenClass tree directly rather than
+building a second dictionary tree first, so memory is bounded by the depth of the tree rather than its size. With
+`types`, the typed form from `as_typed_dict` is written instead, which first walks the tree to build its TypeTable.
+"""
+
+from __future__ import annotations
+
+__all__ = ["iterencode", "dump", "dumps"]
+
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple, Union, TextIO
+
+from weaver.data import WovenClass, ArtefactID, CacheMarker, TypeTable
+
+_encode_str = json.encoder.encode_basestring_ascii
+_encode_float = json.encoder.JSONEncoder(allow_nan=True).iterencode
+
+
+class _Child:
+    """A value still to be encoded, as opposed to an already encoded token."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+def _encode_key(key: Any) -> str:
+    if isinstance(key, str):
+        return _encode_str(key)
+    if key is True:
+        return '"true"'
+    if key is False:
+        return '"false"'
+    if key is None:
+        return '"null"'
+    if isinstance(key, int):
+        return _encode_str(int.__repr__(key))
+    if isinstance(key, float):
+        return _encode_str("".join(_encode_float(key)))
+    raise TypeError(f"keys must be str, int, float, bool or None, not {type(key).__name__}")
+
+
+def _encode_object(pairs: Iterable[Tuple[Any, Any]]) -> Iterator[Union[str, _Child]]:
+    yield "{"
+    separator = ""
+    for key, value in pairs:
+        yield f"{separator}{_encode_key(key)}: "
+        yield _Child(value)
+        separator = ", "
+    yield "}"
+
+
+def _encode_array(values: Iterable[Any]) -> Iterator[Union[str, _Child]]:
+    yield "["
+    separator = ""
+    for value in values:
+        if separator:
+            yield separator
+        yield _Child(value)
+        separator = ", "
+    yield "]"
+
+
+def _woven_class_pairs(item: WovenClass) -> Iterator[Tuple[str, Any]]:
+    yield "pointer", item.pointer
+    yield "metadata", item.metadata.as_dict()
+    yield "artefacts", list(item.artefacts)
+    yield "documentation", _encode_object(
+        (key.to_str(), value) for (key, value) in item.documentation.items()
+    )
+    yield "method_source", item.method_source
+    yield "json", item.json
+
+
+def iterencode(item: Any, types: bool = False) -> Iterator[str]:
+    """Yield the JSON encoding of a woven item in pieces, in the typed form if `types` is set."""
+    table: Optional[TypeTable] = None
+    if types:
+        table = TypeTable.collect(item)
+        stack = [_encode_object([("types", table.as_list()), ("root", item)])]
+    else:
+        stack = [iter([_Child(item)])]
+    while stack:
+        try:
+            token = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        if isinstance(token, str):
+            yield token
+            continue
+        value = token.value
+        if isinstance(value, str):
+            yield _encode_str(value)
+        elif value is None:
+            yield "null"
+        elif value is True:
+            yield "true"
+        elif value is False:
+            yield "false"
+        elif isinstance(value, int):
+            yield int.__repr__(value)
+        elif isinstance(value, float):
+            yield from _encode_float(value)
+        elif isinstance(value, (WovenClass, ArtefactID, CacheMarker)) and table is not None:
+            stack.append(_encode_object(table.node_dict(value).items()))
+        elif isinstance(value, WovenClass):
+            stack.append(_encode_object(_woven_class_pairs(value)))
+        elif isinstance(value, (ArtefactID, CacheMarker)):
+            stack.append(_encode_object(value.as_dict().items()))
+        elif isinstance(value, Dict):
+            stack.append(_encode_object(value.items()))
+        elif isinstance(value, (list, tuple, set)):
+            stack.append(_encode_array(value))
+        elif isinstance(value, Iterator):
+            # Pre-encoded object, used for mappings whose keys need converting.
+            stack.append(value)
+        else:
+            raise TypeError(
+                f"Object of type {type(value).__name__} is not JSON serializable"
+            )
+
+
+def dump(item: Any, fp: TextIO, chunk_size: int = 1 << 16, types: bool = False) -> None:
+    """Write a woven item to a text file as JSON, flushing roughly every `chunk_size` characters."""
+    chunk = []
+    length = 0
+    for token in iterencode(item, types):
+        chunk.append(token)
+        length += len(token)
+        if length >= chunk_size:
+            fp.write("".join(chunk))
+            chunk = []
+            length = 0
+    if chunk:
+        fp.write("".join(chunk))
+
+
+def dumps(item: Any, types: bool = False) -> str:
+    return "".join(iterencode(item, types))